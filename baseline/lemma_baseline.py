@@ -4,7 +4,6 @@ lemma-delta baseline from Upadhyay et al. 2016
 import argparse
 import spacy
 import json
-import itertools
 from pathlib import Path
 import re
 import numpy as np
@@ -12,7 +11,8 @@ import logging
 from tqdm import tqdm
 
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from preprocess import read_pairs
 
 logger = logging.getLogger(__name__)
 
@@ -37,59 +37,128 @@ def load_docs(docs_dir: Path, subtopics_path: Path):
             if doc_name in docs:
                 doc2txt[doc_name] = json.load(rf)["text"]
 
-    return doc2txt
+    return doc2txt, subtopics
 
 
 def load_mention_pairs(json_path: Path):
-    with open(json_path, "r") as rf:
-        eval_data = json.load(rf)
+    eval_data = list(read_pairs(json_path))
 
     logger.info(f"{len(eval_data)} mention pairs")
 
     return eval_data
 
 
-def run_lemma_baseline(doc2txt, eval_data, threshold):
+class DocPairScores:
+    """
+    tf-idf cosine similarities of document pairs, looked up by the document ids of doc2idx.
+    The scores are stored as one dense block per subtopic (one block of all documents
+    without subtopics), memory grows with the subtopic sizes instead of the corpus size.
+    A document in several subtopics has a row in each of their blocks.
+    Pairs across subtopics are NaN, never above a threshold.
+    """
+
+    def __init__(self, doc2txt, subtopics=None):
+        doc_names = list(doc2txt.keys())
+        self.doc2idx = {doc: idx for idx, doc in enumerate(doc_names)}
+
+        # rows are l2-normalized, so the cosine similarities of a block are one sparse product
+        vectorizer = TfidfVectorizer()
+        doc_vectors = vectorizer.fit_transform([doc2txt[doc] for doc in doc_names])
+
+        if subtopics is None:
+            subtopics = [doc_names]
+
+        # first block of each document (-1 outside the subtopics) and its row in the block,
+        # all (block, row) of the documents in several subtopics
+        self.doc_block = np.full(len(doc_names), -1, dtype=np.int64)
+        self.doc_row = np.zeros(len(doc_names), dtype=np.int64)
+        self.doc_block_rows = {}
+        self.blocks = []
+        for subtopic_docs in subtopics:
+            idx = np.array(
+                list(dict.fromkeys(self.doc2idx[doc] for doc in subtopic_docs if doc in self.doc2idx)), dtype=np.int64
+            )
+            block = len(self.blocks)
+            for row, i in enumerate(idx):
+                if self.doc_block[i] < 0:
+                    self.doc_block[i], self.doc_row[i] = block, row
+                else:
+                    self.doc_block_rows.setdefault(i, {self.doc_block[i]: self.doc_row[i]})[block] = row
+
+            block_vectors = doc_vectors[idx]
+            self.blocks += [(block_vectors @ block_vectors.T).toarray()]
+
+    def lookup(self, docs1: np.ndarray, docs2: np.ndarray) -> np.ndarray:
+        """
+        scores of the pairs (docs1[i], docs2[i]) of document ids
+        """
+        scores = np.full(len(docs1), np.nan, dtype=np.float64)
+        blocks1, blocks2 = self.doc_block[docs1], self.doc_block[docs2]
+        same_block = (blocks1 == blocks2) & (blocks1 >= 0)
+        for block in np.unique(blocks1[same_block]):
+            mask = same_block & (blocks1 == block)
+            scores[mask] = self.blocks[block][self.doc_row[docs1[mask]], self.doc_row[docs2[mask]]]
+
+        # the other pairs may share a later subtopic of a document in several subtopics
+        if self.doc_block_rows:
+            multi = np.array(list(self.doc_block_rows.keys()), dtype=np.int64)
+            candidates = ~same_block & (blocks1 >= 0) & (blocks2 >= 0)
+            candidates &= np.isin(docs1, multi) | np.isin(docs2, multi)
+            for i in np.nonzero(candidates)[0]:
+                rows1, rows2 = self._block_rows(docs1[i]), self._block_rows(docs2[i])
+                for block in rows1.keys() & rows2.keys():
+                    scores[i] = self.blocks[block][rows1[block], rows2[block]]
+                    break
+        return scores
+
+    def _block_rows(self, doc: int):
+        return self.doc_block_rows.get(doc, {self.doc_block[doc]: self.doc_row[doc]})
+
+
+def mention_text(sentence: str) -> str:
+    return re.search(r"<E> (.*) </E>", sentence).group(1).lower()
+
+
+def head_lemmas(nlp, mentions, batch_size: int = 256):
+    """
+    lemma (hash) of the root of the first sentence of each distinct mention,
+    every mention is parsed once however many pairs it appears in
+    """
+    unique_mentions = list(dict.fromkeys(mentions))
+    mention2lemma = {}
+    docs = nlp.pipe(unique_mentions, batch_size=batch_size)
+    for mention, doc in tqdm(zip(unique_mentions, docs), total=len(unique_mentions)):
+        mention2lemma[mention] = next(doc.sents).root.lemma
+    return mention2lemma
+
+
+def run_lemma_baseline(doc2txt, eval_data, threshold, subtopics=None):
 
     label2idx = {"non-coreference": 0, "coreference": 1}
 
-    spacy_en_nlp = spacy.load("en_core_web_lg")
-
-    doc_texts = []
-    doc_names = []
-
-    for doc, txt in doc2txt.items():
-        doc_texts += [txt]
-        doc_names += [doc]
+    # the head lemma only needs the tagger and the parser
+    spacy_en_nlp = spacy.load("en_core_web_lg", disable=["ner"])
 
     logging.info("computing document pair similarities")
-    vectorizer = TfidfVectorizer()
-    vectorizer.fit_transform(doc_texts)
+    doc_pair_scores = DocPairScores(doc2txt, subtopics)
+    doc2idx = doc_pair_scores.doc2idx
 
-    doc_pair_scores = {}
-    for doc1, doc2 in itertools.combinations_with_replacement(doc_names, 2):
-        doc1_vectors = vectorizer.transform(iter([doc2txt[doc1]]))
-        doc2_vectors = vectorizer.transform(iter([doc2txt[doc2]]))
-        sim_score = cosine_similarity(doc1_vectors, doc2_vectors)
-        doc_pair_scores[(doc1, doc2)] = sim_score
-        doc_pair_scores[(doc2, doc1)] = sim_score
+    logging.info("extracting head lemmas")
+    mentions1 = [mention_text(eval_sample["sentence1"]) for eval_sample in eval_data]
+    mentions2 = [mention_text(eval_sample["sentence2"]) for eval_sample in eval_data]
+    mention2lemma = head_lemmas(spacy_en_nlp, mentions1 + mentions2)
 
     logging.info("predicting labels")
-    pred_labels, gold_labels = [], []
-    for eval_sample in tqdm(eval_data):
-        mention1 = re.search(r"<E> (.*) </E>", eval_sample["sentence1"]).group(1).lower()
-        mention2 = re.search(r"<E> (.*) </E>", eval_sample["sentence2"]).group(1).lower()
-        mention1_head_lemma = list(spacy_en_nlp(mention1).sents)[0].root.lemma
-        mention2_head_lemma = list(spacy_en_nlp(mention2).sents)[0].root.lemma
-        doc1 = eval_sample["doc1"]
-        doc2 = eval_sample["doc2"]
-        if (mention1_head_lemma == mention2_head_lemma) and (doc_pair_scores[(doc1, doc2)] >= threshold):
-            pred_labels += [label2idx["coreference"]]
-        else:
-            pred_labels += [label2idx["non-coreference"]]
-        gold_labels += [label2idx[eval_sample["label"]]]
-
-    acc = np.sum(pred_labels == gold_labels) / len(gold_labels)
+    lemmas1 = np.array([mention2lemma[mention] for mention in mentions1], dtype=np.uint64)
+    lemmas2 = np.array([mention2lemma[mention] for mention in mentions2], dtype=np.uint64)
+    docs1 = np.array([doc2idx[eval_sample["doc1"]] for eval_sample in eval_data], dtype=np.int64)
+    docs2 = np.array([doc2idx[eval_sample["doc2"]] for eval_sample in eval_data], dtype=np.int64)
+    gold_labels = np.array([label2idx[eval_sample["label"]] for eval_sample in eval_data], dtype=np.int64)
+
+    # NaN scores (pairs across subtopics) compare False
+    pred_labels = ((lemmas1 == lemmas2) & (doc_pair_scores.lookup(docs1, docs2) >= threshold)).astype(np.int64)
+
+    acc = np.mean(pred_labels == gold_labels)
     precision = np.mean(np.take(gold_labels, np.nonzero(pred_labels)))
     recall = np.mean(np.take(pred_labels, np.nonzero(gold_labels)))
     f1 = (2 * precision * recall) / (precision + recall)
@@ -112,14 +181,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="lemma baseline")
     parser.add_argument("-docs", type=Path, help="documents directory")
     parser.add_argument("-subtopics", type=Path, help="path to subtopics list")
-    parser.add_argument("-dev_path", type=Path, help="path to dev json")
+    parser.add_argument("-dev_path", type=Path, help="path to dev json or jsonl")
     parser.add_argument(
         "-sim_threshold", type=float, default=0.0, help="tf-idf document similarity threshold"
     )
+    parser.add_argument(
+        "-within_subtopic",
+        action="store_true",
+        help="only score document pairs within a subtopic, other pairs are predicted non-coreference",
+    )
 
     args = parser.parse_args()
 
-    doc2txt = load_docs(args.docs, args.subtopics)
+    doc2txt, subtopics = load_docs(args.docs, args.subtopics)
     eval_data = load_mention_pairs(args.dev_path)
 
-    run_lemma_baseline(doc2txt, eval_data, threshold=args.sim_threshold)
+    run_lemma_baseline(
+        doc2txt, eval_data, threshold=args.sim_threshold, subtopics=subtopics if args.within_subtopic else None
+    )
@@ -1,3 +1,4 @@
+import hashlib
 from typing import List, Tuple
 
 import torch
@@ -67,11 +68,61 @@ class CorefClassifier(nn.Module):
 
         return sentence_embeddings
 
+    @property
+    def tokenizer_key(self) -> str:
+        """
+        identifies the tokenization of the model, for caches of pre-tokenized sentences
+        """
+        return hashlib.sha1(f"{self.bert_model_name}|{self.special_tag_tokens}".encode("utf-8")).hexdigest()[:8]
+
+    def tokenize_sentences(self, sentences: List[str]) -> List[List[int]]:
+        """
+        subword ids of each sentence, without the special tokens added to a pair
+        """
+        return self.auto_tokenizer(sentences, add_special_tokens=False)["input_ids"]
+
+    def truncate_pair(self, ids1: List[int], ids2: List[int]) -> Tuple[List[int], List[int]]:
+        """
+        truncate the subword ids of a pair like the fast tokenizer does for `longest_first`:
+        the shorter sentence is kept if it fits in half of the budget, else both sentences
+        get half of it (the longer one, or the second one on a tie, gets the odd token)
+        """
+        budget = self.max_seq_length - self.auto_tokenizer.num_special_tokens_to_add(pair=True)
+        if len(ids1) + len(ids2) <= budget:
+            return ids1, ids2
+
+        swap = len(ids1) > len(ids2)
+        n_short = min(len(ids1), len(ids2))
+        if 2 * n_short > budget:
+            n_short = budget // 2
+        n_long = budget - n_short
+        if swap:
+            return ids1[:n_long], ids2[:n_short]
+        return ids1[:n_short], ids2[:n_long]
+
+    def collate_tokenized(self, batch: List[Tuple]):
+        """
+        build padded model inputs from pre-tokenized (ids 1, ids 2, label, index) pairs,
+        truncated like the tokenization of raw sentence pairs in `forward`
+        """
+        token_ids1, token_ids2, labels, indices = zip(*batch)
+        features = [
+            self.auto_tokenizer.prepare_for_model(*self.truncate_pair(ids1.tolist(), ids2.tolist()))
+            for ids1, ids2 in zip(token_ids1, token_ids2)
+        ]
+        tokenized_sentences = self.auto_tokenizer.pad(features, padding=True, return_tensors="pt")
+        return tokenized_sentences, torch.tensor(labels), torch.tensor(indices)
+
     def forward(self, sentences1: List[str], sentences2: List[str], labels: List[int] = None):
 
         tokenized_sentences = self.auto_tokenizer(
-            sentences1, sentences2, padding=True, truncation=True, max_length=256, return_tensors="pt"
-        ).to(self.device)
+            sentences1, sentences2, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="pt"
+        )
+        return self.forward_tokenized(tokenized_sentences, labels)
+
+    def forward_tokenized(self, tokenized_sentences, labels: List[int] = None):
+
+        tokenized_sentences = tokenized_sentences.to(self.device)
         model_output = self.auto_model(**tokenized_sentences)
         sentence_embeddings = self.mean_pooling(
             model_output, tokenized_sentences["attention_mask"], tokenized_sentences["input_ids"]
@@ -5,61 +5,102 @@ dataset preprocessing
 import argparse
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Tuple
 import random
 import logging
 
 
-def preprocess_eval_dataset(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict, out_path: Path):
+def subtopic_mention_pairs(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict) -> Iterator[Tuple]:
     """
-    take raw dataset and create evaluation split
+    (doc1, doc2, mention1, mention2, is coreference) of every mention pair across
+    two documents of a subtopic, generated one at a time
     """
-    all_mention_pairs = []
     for subtopic_docs in subtopics:
-        doc_pairs = []
         for i in range(len(subtopic_docs)):
             for j in range(i + 1, len(subtopic_docs)):
-                doc_pairs += [(subtopic_docs[i], subtopic_docs[j])]
-        for doc1, doc2 in doc_pairs:
-            for mention1 in doc_dict[doc1]["mentions"]:
-                for mention2 in doc_dict[doc2]["mentions"]:
-                    m1_idx = (doc1, mention1["begin"], mention1["end"])
-                    m2_idx = (doc2, mention2["begin"], mention2["end"])
-                    if (m1_idx, m2_idx) in coref_pairs:
-                        assert coref_pairs[(m1_idx, m2_idx)] == [mention1["sentence"], mention2["sentence"]]
-                        all_mention_pairs += [
-                            {
-                                "doc1": doc1,
-                                "doc2": doc2,
-                                "sentence1": mention1["sentence"],
-                                "sentence2": mention2["sentence"],
-                                "label": "coreference",
-                            }
-                        ]
-                    else:
-                        all_mention_pairs += [
-                            {
-                                "doc1": doc1,
-                                "doc2": doc2,
-                                "sentence1": mention1["sentence"],
-                                "sentence2": mention2["sentence"],
-                                "label": "non-coreference",
-                            }
-                        ]
+                doc1, doc2 = subtopic_docs[i], subtopic_docs[j]
+                for mention1 in doc_dict[doc1]["mentions"]:
+                    for mention2 in doc_dict[doc2]["mentions"]:
+                        m1_idx = (doc1, mention1["begin"], mention1["end"])
+                        m2_idx = (doc2, mention2["begin"], mention2["end"])
+                        is_coref = (m1_idx, m2_idx) in coref_pairs
+                        if is_coref:
+                            assert coref_pairs[(m1_idx, m2_idx)] == [mention1["sentence"], mention2["sentence"]]
+                        yield doc1, doc2, mention1, mention2, is_coref
+
+
+def pair_dict(doc1: str, doc2: str, sentence1: str, sentence2: str, label: str) -> Dict:
+    return {"doc1": doc1, "doc2": doc2, "sentence1": sentence1, "sentence2": sentence2, "label": label}
+
 
+def write_jsonl(pairs: Iterable[Dict], out_path: Path) -> int:
+    """
+    write pairs one json object per line as they are generated, returns the number of pairs
+    """
+    num_pairs = 0
     with open(out_path, "w") as wf:
-        json.dump(all_mention_pairs, wf, indent=2)
+        for pair in pairs:
+            wf.write(json.dumps(pair) + "\n")
+            num_pairs += 1
+    logging.info(f"{num_pairs} pairs written to {out_path}")
+    return num_pairs
 
 
-def collect_pos_neg_pairs(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict):
+def read_pairs(path: Path) -> Iterator[Dict]:
+    """
+    pairs of a JSONL file (one pair per line) or of a JSON list
+    """
+    with open(path, "r") as rf:
+        if str(path).endswith(".jsonl"):
+            for line in rf:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(rf)
 
-    positive_pairs = []
-    soft_candidate_negative_pairs = []
-    hard_candidate_negative_pairs = []
 
-    docs = []
+def eval_pairs(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict) -> Iterator[Dict]:
+    for doc1, doc2, mention1, mention2, is_coref in subtopic_mention_pairs(subtopics, coref_pairs, doc_dict):
+        label = "coreference" if is_coref else "non-coreference"
+        yield pair_dict(doc1, doc2, mention1["sentence"], mention2["sentence"], label)
+
+
+def preprocess_eval_dataset(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict, out_path: Path):
+    """
+    take raw dataset and create evaluation split
+    """
+    write_jsonl(eval_pairs(subtopics, coref_pairs, doc_dict), out_path)
+
+
+class Reservoir:
+    """
+    uniform sample of at most `size` items of a stream (algorithm R)
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.items = []
+        self.seen = 0
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items += [item]
+        else:
+            idx = random.randrange(self.seen)
+            if idx < self.size:
+                self.items[idx] = item
+
+
+def collect_pos_neg_pairs(subtopics: List[List], coref_pairs: Dict, doc_dict: Dict) -> Iterator[Dict]:
+    """
+    all positive pairs, then up to 5 hard and 5 soft negative pairs per positive pair, in both directions.
+    Positives are collected in a first pass over the mention pairs, so that negatives are
+    reservoir sampled in the second pass: memory is bounded by the positives and the samples.
+    """
+    docs = set()
     for subtopic_docs in subtopics:
-        docs += subtopic_docs
+        docs.update(subtopic_docs)
 
     coref_sent_pairs = set()
     for mention_pair, sentence_pair in coref_pairs.items():
@@ -71,82 +112,37 @@ def collect_pos_neg_pairs(subtopics: List[List], coref_pairs: Dict, doc_dict: Di
         s2 = s2.replace("<E> ", "").replace(" </E>", "")
         coref_sent_pairs.update([(s1, s2), (s2, s1)])
 
-    for subtopic_docs in subtopics:
-        doc_pairs = []
-        for i in range(len(subtopic_docs)):
-            for j in range(i + 1, len(subtopic_docs)):
-                doc_pairs += [(subtopic_docs[i], subtopic_docs[j])]
-        for doc1, doc2 in doc_pairs:
-            for mention1 in doc_dict[doc1]["mentions"]:
-                for mention2 in doc_dict[doc2]["mentions"]:
-                    m1_idx = (doc1, mention1["begin"], mention1["end"])
-                    m2_idx = (doc2, mention2["begin"], mention2["end"])
-                    if (m1_idx, m2_idx) in coref_pairs:
-                        assert coref_pairs[(m1_idx, m2_idx)] == [mention1["sentence"], mention2["sentence"]]
-                        positive_pairs += [
-                            {
-                                "doc1": doc1,
-                                "doc2": doc2,
-                                "sentence1": mention1["sentence"],
-                                "sentence2": mention2["sentence"],
-                                "label": "coreference",
-                            },
-                            {
-                                "doc1": doc2,
-                                "doc2": doc1,
-                                "sentence1": mention2["sentence"],
-                                "sentence2": mention1["sentence"],
-                                "label": "coreference",
-                            },
-                        ]
-                    else:
-                        s1 = mention1["sentence"].replace("<E> ", "").replace(" </E>", "")
-                        s2 = mention2["sentence"].replace("<E> ", "").replace(" </E>", "")
-                        if (s1, s2) in coref_sent_pairs or (s2, s1) in coref_sent_pairs:
-                            # coref link exists between a different mention pair between the same sentence
-                            hard_candidate_negative_pairs += [
-                                {
-                                    "doc1": doc1,
-                                    "doc2": doc2,
-                                    "sentence1": mention1["sentence"],
-                                    "sentence2": mention2["sentence"],
-                                    "label": "non-coreference",
-                                },
-                                {
-                                    "doc1": doc2,
-                                    "doc2": doc1,
-                                    "sentence1": mention2["sentence"],
-                                    "sentence2": mention1["sentence"],
-                                    "label": "non-coreference",
-                                },
-                            ]
-                        else:
-                            soft_candidate_negative_pairs += [
-                                {
-                                    "doc1": doc1,
-                                    "doc2": doc2,
-                                    "sentence1": mention1["sentence"],
-                                    "sentence2": mention2["sentence"],
-                                    "label": "non-coreference",
-                                },
-                                {
-                                    "doc1": doc2,
-                                    "doc2": doc1,
-                                    "sentence1": mention2["sentence"],
-                                    "sentence2": mention1["sentence"],
-                                    "label": "non-coreference",
-                                },
-                            ]
-
-    random.shuffle(hard_candidate_negative_pairs)
-    random.shuffle(soft_candidate_negative_pairs)
-
-    negative_pairs = hard_candidate_negative_pairs[: 5 * len(positive_pairs)]
-    negative_pairs += soft_candidate_negative_pairs[: 5 * len(positive_pairs)]
-
-    train_pairs = positive_pairs + negative_pairs
-
-    return train_pairs
+    positive_pairs = []
+    for doc1, doc2, mention1, mention2, is_coref in subtopic_mention_pairs(subtopics, coref_pairs, doc_dict):
+        if is_coref:
+            positive_pairs += [
+                (doc1, doc2, mention1["sentence"], mention2["sentence"]),
+                (doc2, doc1, mention2["sentence"], mention1["sentence"]),
+            ]
+
+    hard_candidate_negative_pairs = Reservoir(5 * len(positive_pairs))
+    soft_candidate_negative_pairs = Reservoir(5 * len(positive_pairs))
+    for doc1, doc2, mention1, mention2, is_coref in subtopic_mention_pairs(subtopics, coref_pairs, doc_dict):
+        if is_coref:
+            continue
+        s1 = mention1["sentence"].replace("<E> ", "").replace(" </E>", "")
+        s2 = mention2["sentence"].replace("<E> ", "").replace(" </E>", "")
+        if (s1, s2) in coref_sent_pairs or (s2, s1) in coref_sent_pairs:
+            # coref link exists between a different mention pair between the same sentence
+            reservoir = hard_candidate_negative_pairs
+        else:
+            reservoir = soft_candidate_negative_pairs
+        reservoir.add((doc1, doc2, mention1["sentence"], mention2["sentence"]))
+        reservoir.add((doc2, doc1, mention2["sentence"], mention1["sentence"]))
+
+    for pair in positive_pairs:
+        yield pair_dict(*pair, "coreference")
+
+    for reservoir in [hard_candidate_negative_pairs, soft_candidate_negative_pairs]:
+        # the order of a reservoir is not random
+        random.shuffle(reservoir.items)
+        for pair in reservoir.items:
+            yield pair_dict(*pair, "non-coreference")
 
 
 def preprocess_train_dataset(
@@ -156,10 +152,7 @@ def preprocess_train_dataset(
     random.seed(seed)
 
     # full train
-    all_train_pairs = collect_pos_neg_pairs(subtopics, coref_pairs, doc_dict)
-
-    with open(out_dir / f"train.json", "w") as wf:
-        json.dump(all_train_pairs, wf, indent=2)
+    write_jsonl(collect_pos_neg_pairs(subtopics, coref_pairs, doc_dict), out_dir / "train.jsonl")
 
     # k-fold cross validation
     assert len(subtopics) % k == 0
@@ -177,11 +170,8 @@ def preprocess_train_dataset(
         logging.info(f"(cross-validation) train: {len(cv_train_subtopics)}")
         logging.info(f"(cross-validation) dev: {len(cv_dev_subtopics)}")
 
-        cv_train_pairs = collect_pos_neg_pairs(cv_train_subtopics, coref_pairs, doc_dict)
-        preprocess_eval_dataset(cv_dev_subtopics, coref_pairs, doc_dict, out_dir / f"dev_{i}.json")
-
-        with open(out_dir / f"train_{i}.json", "w") as wf:
-            json.dump(cv_train_pairs, wf, indent=2)
+        write_jsonl(collect_pos_neg_pairs(cv_train_subtopics, coref_pairs, doc_dict), out_dir / f"train_{i}.jsonl")
+        preprocess_eval_dataset(cv_dev_subtopics, coref_pairs, doc_dict, out_dir / f"dev_{i}.jsonl")
 
         with open(out_dir / f"train_{i}_subtopics.txt", "w") as wf:
             wf.write("\n".join([" ".join(st) for st in cv_train_subtopics]))
@@ -235,4 +225,4 @@ if __name__ == "__main__":
 
     args.out_dir.mkdir(exist_ok=True)
     preprocess_train_dataset(train_subtopics, coref_pairs, doc_dict, args.out_dir, args.seed)
-    preprocess_eval_dataset(test_subtopics, coref_pairs, doc_dict, args.out_dir / "test_pairs.json")
+    preprocess_eval_dataset(test_subtopics, coref_pairs, doc_dict, args.out_dir / "test_pairs.jsonl")
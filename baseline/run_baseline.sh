@@ -7,7 +7,7 @@ do
     python lemma_baseline.py \
         -docs raw_data/dataset_docs/ \
         -subtopics data_122/dev_${i}_subtopics.txt \
-        -dev_path data_122/dev_${i}.json \
+        -dev_path data_122/dev_${i}.jsonl \
         -sim_threshold 0
     echo "----------------------"
 done
@@ -15,5 +15,5 @@ done
 python lemma_baseline.py \
     -docs raw_data/dataset_docs/ \
     -subtopics raw_data/dataset_splits/test_subtopics.txt \
-    -dev_path data_122/test_pairs.json \
+    -dev_path data_122/test_pairs.jsonl \
     -sim_threshold 0
\ No newline at end of file
@@ -7,7 +7,7 @@
 
 # cd ..
 # python train.py train \
-#     -train_path data_122/train.json \
+#     -train_path data_122/train.jsonl \
 #     -save_dir saved_models/ \
 #     -epochs 5 \
 #     -config configs/config_event_tag.json
@@ -16,7 +16,7 @@ cd ..
 for i in `seq 1 5`;
 do
     python train.py train \
-        -train_path data_155/train.json \
+        -train_path data_155/train.jsonl \
         -save_dir saved_models/ \
         -epochs 5 \
         -config configs/config_event_tag.json
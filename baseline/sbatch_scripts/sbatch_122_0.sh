@@ -7,7 +7,7 @@
 
 cd ..
 python train.py train \
-    -train_path data_122/train_0.json \
-    -dev_path data_122/dev_0.json \
+    -train_path data_122/train_0.jsonl \
+    -dev_path data_122/dev_0.jsonl \
     -save_dir saved_models/ \
     -config configs/config_event_tag.json
\ No newline at end of file
@@ -7,7 +7,7 @@
 
 cd ..
 python train.py train \
-    -train_path data_122/train_1.json \
-    -dev_path data_122/dev_1.json \
+    -train_path data_122/train_1.jsonl \
+    -dev_path data_122/dev_1.jsonl \
     -save_dir saved_models/ \
     -config configs/config_event_tag.json
\ No newline at end of file
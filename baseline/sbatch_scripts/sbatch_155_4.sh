@@ -7,7 +7,7 @@
 
 cd ..
 python train.py train \
-    -train_path data_155/train_4.json \
-    -dev_path data_155/dev_4.json \
+    -train_path data_155/train_4.jsonl \
+    -dev_path data_155/dev_4.jsonl \
     -save_dir saved_models/ \
     -config configs/config_event_tag.json
\ No newline at end of file
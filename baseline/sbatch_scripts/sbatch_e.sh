@@ -8,16 +8,16 @@
 cd ..
 # python train.py inference \
 #     -model_path saved_models/coref_classifier_2021-06-12_00-19-20.bin \
-#     -data_path data_122/test_pairs.json
+#     -data_path data_122/test_pairs.jsonl
 python train.py inference \
     -model_path saved_models/coref_classifier_2021-06-12_01-26-43.bin \
-    -data_path data_122/test_pairs.json
+    -data_path data_122/test_pairs.jsonl
 python train.py inference \
     -model_path saved_models/coref_classifier_2021-06-12_01-27-15.bin \
-    -data_path data_122/test_pairs.json
+    -data_path data_122/test_pairs.jsonl
 python train.py inference \
     -model_path saved_models/coref_classifier_2021-06-12_01-28-45.bin \
-    -data_path data_122/test_pairs.json
+    -data_path data_122/test_pairs.jsonl
 python train.py inference \
     -model_path saved_models/coref_classifier_2021-06-12_01-29-32.bin \
-    -data_path data_122/test_pairs.json
\ No newline at end of file
+    -data_path data_122/test_pairs.jsonl
\ No newline at end of file
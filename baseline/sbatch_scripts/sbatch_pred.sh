@@ -9,5 +9,5 @@ cd ..
 
 python train.py inference \
     -model_path saved_models/coref_classifier_2021-06-11_22-18-27.bin \
-    -data_path data_122/dev_1.json \
+    -data_path data_122/dev_1.jsonl \
     -preds output_preds/preds.json
\ No newline at end of file
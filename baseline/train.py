@@ -9,28 +9,75 @@ from datetime import datetime
 
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Sampler
 import transformers
 
-from utils import load_dataset, load_eval_dataset, write_predictions
+from utils import TokenizedPairDataset, load_dataset, load_eval_dataset, load_token_ids, write_predictions
 from models import CorefClassifier
 
 logger = logging.getLogger(__name__)
 
 
+class LengthBucketBatchSampler(Sampler):
+    """
+    batches of pairs of similar lengths, to reduce padding: pairs are (shuffled and) split
+    into buckets of `bucket_batches` batches, sorted by length within a bucket and cut into
+    batches, then the batches are shuffled
+    """
+
+    def __init__(self, lengths: np.ndarray, batch_size: int, shuffle: bool = False, bucket_batches: int = 50):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_size = batch_size * bucket_batches
+
+    def __iter__(self):
+        if self.shuffle:
+            indices = np.random.permutation(len(self.lengths))
+        else:
+            indices = np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(indices), self.bucket_size):
+            bucket = indices[start : start + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batches += [bucket[i : i + self.batch_size].tolist() for i in range(0, len(bucket), self.batch_size)]
+
+        if self.shuffle:
+            batches = [batches[i] for i in np.random.permutation(len(batches))]
+
+        return iter(batches)
+
+    def __len__(self):
+        full_buckets, last_bucket = divmod(len(self.lengths), self.bucket_size)
+        return full_buckets * math.ceil(self.bucket_size / self.batch_size) + math.ceil(last_bucket / self.batch_size)
+
+
+def tokenized_dataloader(
+    model: CorefClassifier, dataset, dataset_path: Path, batch_size: int, shuffle: bool, bucket_batches: int
+) -> DataLoader:
+    """
+    batches of pre-tokenized pairs, bucketed by length
+    """
+    token_ids = load_token_ids(dataset_path, dataset, model.tokenize_sentences, model.tokenizer_key)
+    tokenized_data = TokenizedPairDataset(dataset, token_ids)
+    batch_sampler = LengthBucketBatchSampler(tokenized_data.lengths(), batch_size, shuffle, bucket_batches)
+    return DataLoader(tokenized_data, batch_sampler=batch_sampler, collate_fn=model.collate_tokenized)
+
+
 def evaluator(model, data, return_preds: bool = False):
     model.eval()
 
-    pred_labels, gold_labels = [], []
-    for _, batch in tqdm(enumerate(data)):
-        batch_sentences1, batch_sentences2, batch_labels = batch
-        logits, _ = model(batch_sentences1, batch_sentences2)
-        logits = nn.functional.softmax(logits, dim=1)
-        pred_labels += list(np.argmax(logits.detach().cpu().numpy(), axis=1))
-        gold_labels += list(batch_labels.numpy())
-
-    pred_labels = np.array(pred_labels)
-    gold_labels = np.array(gold_labels)
+    # batches are bucketed by length, predictions are put back in dataset order
+    pred_labels = np.zeros(len(data.dataset), dtype=np.int64)
+    gold_labels = np.zeros(len(data.dataset), dtype=np.int64)
+    with torch.no_grad():
+        for _, batch in tqdm(enumerate(data)):
+            tokenized_sentences, batch_labels, batch_indices = batch
+            logits, _ = model.forward_tokenized(tokenized_sentences)
+            logits = nn.functional.softmax(logits, dim=1)
+            pred_labels[batch_indices.numpy()] = np.argmax(logits.cpu().numpy(), axis=1)
+            gold_labels[batch_indices.numpy()] = batch_labels.numpy()
 
     acc = np.sum(pred_labels == gold_labels) / len(gold_labels)
     logger.info("Accuracy: {:.2f}".format(acc * 100))
@@ -79,10 +126,6 @@ def train(args):
     if len(dev_data) > 0:
         run_eval = True
 
-    train_dataloader = DataLoader(train_data, shuffle=True, batch_size=args.batch_size)
-    if run_eval:
-        dev_dataloader = DataLoader(dev_data, batch_size=args.batch_size)
-
     model = CorefClassifier(
         bert_model_name=args.bert_model,
         num_labels=len(label2idx),
@@ -92,6 +135,14 @@ def train(args):
     if torch.cuda.is_available():
         model = model.cuda()
 
+    train_dataloader = tokenized_dataloader(
+        model, train_data, args.train_path, args.batch_size, shuffle=True, bucket_batches=args.bucket_batches
+    )
+    if run_eval:
+        dev_dataloader = tokenized_dataloader(
+            model, dev_data, args.dev_path, args.batch_size, shuffle=False, bucket_batches=args.bucket_batches
+        )
+
     model_parameters = model.named_parameters()
     no_decay = ["bias", "LayerNorm.bias", "LayerNorm.weight"]
     optimizer_grouped_parameters = [
@@ -121,8 +172,8 @@ def train(args):
         for step_idx, batch in tqdm(enumerate(train_dataloader)):
             model.train()
             optimizer.zero_grad()
-            batch_sentences1, batch_sentences2, batch_labels = batch
-            _, loss = model(batch_sentences1, batch_sentences2, batch_labels)
+            tokenized_sentences, batch_labels, _ = batch
+            _, loss = model.forward_tokenized(tokenized_sentences, batch_labels)
             loss.backward()
             nn.utils.clip_grad_norm_(model.parameters(), 1)
             optimizer.step()
@@ -164,12 +215,15 @@ def inference(args):
     )
 
     eval_data, label2idx = load_eval_dataset(args.data_path)
-    eval_dataloader = DataLoader(eval_data, batch_size=args.batch_size)
 
     model = CorefClassifier.load(args.model_path)
     if torch.cuda.is_available():
         model = model.cuda()
 
+    eval_dataloader = tokenized_dataloader(
+        model, eval_data, args.data_path, args.batch_size, shuffle=False, bucket_batches=args.bucket_batches
+    )
+
     if args.preds is None:
         acc, precision, recall, f1 = evaluator(model, eval_dataloader)
     else:
@@ -185,8 +239,8 @@ if __name__ == "__main__":
     subparsers = parser.add_subparsers()
 
     train_parser = subparsers.add_parser("train", help="train classifer")
-    train_parser.add_argument("-train_path", type=Path, help="path to preprocessed train json")
-    train_parser.add_argument("-dev_path", type=Path, default=None, help="path to preprocessed dev json")
+    train_parser.add_argument("-train_path", type=Path, help="path to preprocessed train json or jsonl")
+    train_parser.add_argument("-dev_path", type=Path, default=None, help="path to preprocessed dev json or jsonl")
     train_parser.add_argument("-save_dir", type=Path, help="path to save model")
     train_parser.add_argument("-bert_model", type=str, default="bert-base-uncased")
     train_parser.add_argument("-batch_size", type=int, default=16, help="train batch size")
@@ -196,13 +250,19 @@ if __name__ == "__main__":
     train_parser.add_argument("-lr", type=float, default=2e-5, help="learning rate")
     train_parser.add_argument("-weight_decay", type=float, default=0.01, help="weight decay")
     train_parser.add_argument("-config", type=Path, help="path to config")
+    train_parser.add_argument(
+        "-bucket_batches", type=int, default=50, help="number of batches per length bucket, 1 to turn off bucketing"
+    )
     train_parser.set_defaults(func=train)
 
     eval_parser = subparsers.add_parser("inference", help="eval classifier")
     eval_parser.add_argument("-model_path", type=str, help="path to load model")
-    eval_parser.add_argument("-data_path", type=str, help="path to eval json")
+    eval_parser.add_argument("-data_path", type=str, help="path to eval json or jsonl")
     eval_parser.add_argument("-batch_size", type=int, default=16, help="eval batch size")
     eval_parser.add_argument("-preds", type=Path, default=None, help="path to write model predictions")
+    eval_parser.add_argument(
+        "-bucket_batches", type=int, default=50, help="number of batches per length bucket, 1 to turn off bucketing"
+    )
     eval_parser.set_defaults(func=inference)
 
     args = parser.parse_args()
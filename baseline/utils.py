@@ -1,70 +1,169 @@
 import json
+import os
+from array import array
 from pathlib import Path
 import logging
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
 
+import numpy as np
 from torch.utils.data import Dataset
 
+from preprocess import read_pairs
+
 logger = logging.getLogger(__name__)
 
 
 class CustomDataset(Dataset):
-    def __init__(self, sentences1: List[str], sentences2: List[str], labels: List[int]) -> None:
+    """
+    pairs (n, 3) of (sentence id 1, sentence id 2, label) over a table of unique sentences
+    """
+
+    def __init__(self, sentences: List[str], pairs: np.ndarray) -> None:
         super().__init__()
 
-        self.sentences1 = sentences1
-        self.sentences2 = sentences2
-        assert len(self.sentences1) == len(self.sentences2)
-        self.labels = labels
+        self.sentences = sentences
+        self.pairs = pairs
+        assert self.pairs.ndim == 2 and self.pairs.shape[1] == 3
 
     def __len__(self):
-        return len(self.sentences1)
+        return len(self.pairs)
 
     def __getitem__(self, index: int):
-        return self.sentences1[index], self.sentences2[index], self.labels[index]
+        sent_id1, sent_id2, label = self.pairs[index]
+        return self.sentences[sent_id1], self.sentences[sent_id2], int(label)
+
+
+def compact_paths(processed_dataset_path: Path) -> Tuple[Path, Path]:
+    """
+    sentence table and pairs array of the compact form of a dataset, next to it
+    """
+    # the full file name, so that x.json and x.jsonl do not share a cache
+    path = Path(processed_dataset_path)
+    return path.with_name(path.name + ".sentences.json"), path.with_name(path.name + ".pairs.npy")
+
+
+def write_compact_dataset(processed_dataset_path: Path, label2idx: Dict[str, int]):
+    """
+    deduplicate the sentences of a JSON/JSONL dataset into a table and store the pairs
+    as an int32 array of (sentence id 1, sentence id 2, label)
+    """
+    sentences_path, pairs_path = compact_paths(processed_dataset_path)
+
+    sentence2id = {}
+    # flat (sentence id 1, sentence id 2, label) int32 values, 12 bytes per pair
+    pairs = array("i")
+    for x in read_pairs(processed_dataset_path):
+        sent_id1 = sentence2id.setdefault(x["sentence1"], len(sentence2id))
+        sent_id2 = sentence2id.setdefault(x["sentence2"], len(sentence2id))
+        pairs.extend((sent_id1, sent_id2, label2idx[x["label"]]))
+
+    logger.info(f"{len(pairs) // 3} pairs over {len(sentence2id)} unique sentences")
+
+    tmp_suffix = f".{os.getpid()}.tmp"
+    with open(str(sentences_path) + tmp_suffix, "w") as wf:
+        json.dump(list(sentence2id.keys()), wf)
+    with open(str(pairs_path) + tmp_suffix, "wb") as wf:
+        np.save(wf, np.frombuffer(pairs, dtype=np.int32).reshape(-1, 3))
+    # the pairs array is replaced last, it marks a complete conversion
+    os.replace(str(sentences_path) + tmp_suffix, sentences_path)
+    os.replace(str(pairs_path) + tmp_suffix, pairs_path)
+
+
+def read_dataset(processed_dataset_path: Path, label2idx: Dict[str, int]) -> CustomDataset:
+    """
+    load the compact form of a dataset, converted on first use or when the dataset changed;
+    the pairs array is memory-mapped
+    """
+    sentences_path, pairs_path = compact_paths(processed_dataset_path)
+    source_mtime = os.path.getmtime(processed_dataset_path)
+    if not (sentences_path.exists() and pairs_path.exists() and os.path.getmtime(pairs_path) >= source_mtime):
+        write_compact_dataset(processed_dataset_path, label2idx)
+
+    with open(sentences_path, "r") as rf:
+        sentences = json.load(rf)
+
+    return CustomDataset(sentences, np.load(pairs_path, mmap_mode="r"))
+
+
+class TokenizedPairDataset(Dataset):
+    """
+    pairs of a CustomDataset as (subword ids 1, subword ids 2, label, index),
+    over the pre-tokenized sentence table
+    """
+
+    def __init__(self, dataset: CustomDataset, token_ids: List[np.ndarray]) -> None:
+        super().__init__()
+
+        self.dataset = dataset
+        self.token_ids = token_ids
+        assert len(self.token_ids) == len(self.dataset.sentences)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index: int):
+        sent_id1, sent_id2, label = self.dataset.pairs[index]
+        return self.token_ids[sent_id1], self.token_ids[sent_id2], int(label), index
+
+    def lengths(self) -> np.ndarray:
+        """
+        number of subwords of each pair, without the special tokens
+        """
+        sentence_lengths = np.array([len(ids) for ids in self.token_ids], dtype=np.int64)
+        return sentence_lengths[self.dataset.pairs[:, 0]] + sentence_lengths[self.dataset.pairs[:, 1]]
+
+
+def load_token_ids(
+    processed_dataset_path: Path,
+    dataset: CustomDataset,
+    tokenize: Callable[[List[str]], List[List[int]]],
+    tokenizer_key: str,
+    chunk_size: int = 10000,
+) -> List[np.ndarray]:
+    """
+    subword ids of every sentence of the table of `dataset`, tokenized once and cached
+    next to the dataset per tokenizer (`tokenizer_key`) as a flat array and offsets
+    """
+    path = Path(processed_dataset_path)
+    tokens_path = path.with_name(f"{path.name}.tokens-{tokenizer_key}.npz")
+    _, pairs_path = compact_paths(processed_dataset_path)
+
+    if not (tokens_path.exists() and os.path.getmtime(tokens_path) >= os.path.getmtime(pairs_path)):
+        logger.info(f"tokenizing {len(dataset.sentences)} unique sentences")
+        # typed buffers: a list of python ints takes ~36 bytes per subword
+        flat_ids, lengths = array("i"), array("q")
+        for start in range(0, len(dataset.sentences), chunk_size):
+            for ids in tokenize(dataset.sentences[start : start + chunk_size]):
+                flat_ids.extend(ids)
+                lengths.append(len(ids))
+        offsets = np.concatenate([[0], np.cumsum(np.frombuffer(lengths, dtype=np.int64))])
+
+        tmp_path = str(tokens_path) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as wf:
+            np.savez(wf, ids=np.frombuffer(flat_ids, dtype=np.int32), offsets=offsets)
+        os.replace(tmp_path, tokens_path)
+
+    with np.load(tokens_path) as tokens:
+        ids, offsets = tokens["ids"], tokens["offsets"]
+    return [ids[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)]
 
 
 def load_dataset(train_path: Path, dev_path: Path = None):
-    train_data, dev_data = [], []
+    dev_data = []
     label2idx = {"non-coreference": 0, "coreference": 1}
 
-    with open(train_path, "r") as rf:
-        data = json.load(rf)
-        sentences1, sentences2, labels = [], [], []
-        for x in data:
-            sentences1 += [x["sentence1"]]
-            sentences2 += [x["sentence2"]]
-            labels += [label2idx[x["label"]]]
-
-        train_data = CustomDataset(sentences1, sentences2, labels)
+    train_data = read_dataset(train_path, label2idx)
 
     if dev_path is not None:
-        with open(dev_path, "r") as rf:
-            data = json.load(rf)
-            sentences1, sentences2, labels = [], [], []
-            for x in data:
-                sentences1 += [x["sentence1"]]
-                sentences2 += [x["sentence2"]]
-                labels += [label2idx[x["label"]]]
-
-            dev_data = CustomDataset(sentences1, sentences2, labels)
+        dev_data = read_dataset(dev_path, label2idx)
 
     return train_data, dev_data, label2idx
 
 
 def load_eval_dataset(processed_dataset_path: Path):
-    eval_data = []
     label2idx = {"non-coreference": 0, "coreference": 1}
 
-    with open(processed_dataset_path, "r") as rf:
-        data = json.load(rf)
-        sentences1, sentences2, labels = [], [], []
-        for x in data:
-            sentences1 += [x["sentence1"]]
-            sentences2 += [x["sentence2"]]
-            labels += [label2idx[x["label"]]]
-
-        eval_data = CustomDataset(sentences1, sentences2, labels)
+    eval_data = read_dataset(processed_dataset_path, label2idx)
 
     return eval_data, label2idx
 
@@ -73,18 +172,12 @@ def write_predictions(processed_dataset_path: Path, pred_labels: List[int], out_
     label2idx = {"non-coreference": 0, "coreference": 1}
     idx2label = {0: "non-coreference", 1: "coreference"}
 
-    sentences1, sentences2, labels = [], [], []
-    with open(processed_dataset_path, "r") as rf:
-        data = json.load(rf)
-        for x in data:
-            sentences1 += [x["sentence1"]]
-            sentences2 += [x["sentence2"]]
-            labels += [label2idx[x["label"]]]
+    dataset = read_dataset(processed_dataset_path, label2idx)
 
-    assert len(labels) == len(pred_labels)
+    assert len(dataset) == len(pred_labels)
 
     out_data = []
-    for s1, s2, gold_label, pred_label in zip(sentences1, sentences2, labels, pred_labels):
+    for (s1, s2, gold_label), pred_label in zip(dataset, pred_labels):
         out_data += [
             {
                 "sentence1": s1,
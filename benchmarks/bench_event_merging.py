@@ -0,0 +1,128 @@
+"""
+micro-benchmark of candidate merging and phrase detection in the combined event detector,
+compares processors/event_merging.py against the previous quadratic implementation
+on synthetic documents with dense, overlapping candidates
+
+python benchmarks/bench_event_merging.py -tokens 5000 -candidates 2000
+"""
+import os
+import sys
+import argparse
+import copy
+import random
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from processors.event_merging import merge_event_candidates, find_phrase_pairs, detect_phrases
+
+# stands in for a spaCy token, `head` is filled in after creation
+FakeToken = namedtuple("FakeToken", ["text", "dep_", "head"])
+
+VOCAB = ["set", "up", "car", "bomb", "attack", "fire", "take", "off", "blast", "rescue", "work", "plant"]
+DEPS = ["compound", "prt", "dobj", "nsubj", "ROOT"]
+
+
+def naive_merge(candidates):
+    detected_events = list()
+    for event in candidates:
+        flag_exist = False
+        for existing_event in detected_events:
+            if event['begin'] == existing_event['begin'] and event['end'] == existing_event['end']:
+                flag_exist = True
+                existing_event['source'] += event['source']
+            elif existing_event['begin'] <= event['begin'] and event['end'] <= existing_event['end']:
+                flag_exist = True
+                existing_event['source'] += event['source']
+            elif event['begin'] <= existing_event['begin'] and existing_event['end'] <= event['end']:
+                flag_exist = True
+                existing_event['source'] += event['source']
+        if not flag_exist:
+            detected_events.append(event)
+    return detected_events
+
+
+def naive_phrases(detected_events, doc):
+    detected_events = sorted(detected_events, key=lambda x: x['begin'])
+    replacements = list()
+    skip_idx = list()
+    for idx in range(len(detected_events) - 1):
+        if idx in skip_idx:
+            continue
+        if int(detected_events[idx + 1]['begin']) - int(detected_events[idx]['end']) <= 2:
+            for idx_ in range(len(doc) - 1):
+                if doc[idx_].text == detected_events[idx]['nugget'] and doc[idx_ + 1].text == detected_events[idx + 1]['nugget']:
+                    if (doc[idx_].head.text == doc[idx_ + 1].text) or (doc[idx_].text == doc[idx_ + 1].head.text):
+                        if doc[idx_].dep_ == 'compound' \
+                                or (doc[idx_].dep_ == 'prt' or doc[idx_ + 1].dep_ == 'prt'):
+                            new_event = {'begin': detected_events[idx]['begin'],
+                                         'end': detected_events[idx + 1]['end'],
+                                         'source': 'P',
+                                         'nugget': detected_events[idx]['nugget'] + ' ' + detected_events[idx + 1]['nugget']}
+                            replacements.append((detected_events[idx], detected_events[idx + 1], new_event))
+                            skip_idx.append(idx + 1)
+                            break
+    for replacement in replacements:
+        if replacement[0] not in detected_events:
+            continue
+        detected_events.remove(replacement[0])
+        detected_events.remove(replacement[1])
+        detected_events.append(replacement[2])
+    return detected_events
+
+
+def synthetic_document(num_tokens: int, num_candidates: int, rng: random.Random):
+    texts = [rng.choice(VOCAB) for _ in range(num_tokens)]
+    heads = [rng.randrange(num_tokens) for _ in range(num_tokens)]
+    deps = [rng.choice(DEPS) for _ in range(num_tokens)]
+
+    tokens = [FakeToken(text, dep, None) for text, dep in zip(texts, deps)]
+    doc = [token._replace(head=tokens[head]) for token, head in zip(tokens, heads)]
+
+    # token i spans [6 * i, 6 * i + 5), candidates cover 1 to 3 tokens
+    candidates = []
+    for _ in range(num_candidates):
+        first = rng.randrange(num_tokens)
+        last = min(num_tokens - 1, first + rng.choice([0, 0, 0, 1, 2]))
+        nugget = texts[first] if first == last else texts[first:last + 1]
+        candidates.append({'begin': 6 * first, 'end': 6 * last + 5, 'source': rng.choice("LNJA"), 'nugget': nugget})
+    candidates = sorted(candidates, key=lambda x: x['begin'])
+
+    return doc, candidates
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark event candidate merging")
+    parser.add_argument("-tokens", type=int, default=3000, help="tokens per document")
+    parser.add_argument("-candidates", type=int, default=1500, help="event candidates per document")
+    parser.add_argument("-docs", type=int, default=5, help="number of synthetic documents")
+    parser.add_argument("-seed", type=int, default=31, help="random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    totals = {"naive merge": 0.0, "sweep merge": 0.0, "naive phrases": 0.0, "linear phrases": 0.0}
+    for _ in range(args.docs):
+        doc, candidates = synthetic_document(args.tokens, args.candidates, rng)
+
+        naive_merged, elapsed = timed(naive_merge, copy.deepcopy(candidates))
+        totals["naive merge"] += elapsed
+        merged, elapsed = timed(merge_event_candidates, copy.deepcopy(candidates))
+        totals["sweep merge"] += elapsed
+        assert merged == naive_merged
+
+        naive_events, elapsed = timed(naive_phrases, copy.deepcopy(merged), doc)
+        totals["naive phrases"] += elapsed
+        events, elapsed = timed(lambda e, d: detect_phrases(e, find_phrase_pairs(d)), copy.deepcopy(merged), doc)
+        totals["linear phrases"] += elapsed
+        assert events == naive_events
+
+    print(f"{args.docs} documents, {args.tokens} tokens, {args.candidates} candidates each")
+    for name, elapsed in totals.items():
+        print(f"{name:>15}: {elapsed / args.docs * 1000:.2f} ms/doc")
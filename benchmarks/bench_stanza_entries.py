@@ -0,0 +1,126 @@
+"""
+micro-benchmark of the creation of Sentence/Token/Dependency entries from stanza output,
+compares add_stanza_sentences in processors/stanfordnlp_processor.py against the previous
+implementation parsing `word.misc`, on synthetic stanza sentences
+
+python benchmarks/bench_stanza_entries.py -tokens 100000
+"""
+import os
+import sys
+import argparse
+import random
+import time
+from collections import namedtuple
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from forte.data.data_pack import DataPack
+from ft.onto.base_ontology import Token, Sentence, Dependency
+
+from processors.stanfordnlp_processor import add_stanza_sentences
+
+# stand in for the stanza sentence, token and word objects
+FakeSentence = namedtuple("FakeSentence", ["tokens", "words"])
+FakeToken = namedtuple("FakeToken", ["start_char", "end_char", "words"])
+FakeWord = namedtuple("FakeWord", ["misc", "pos", "xpos", "lemma", "head", "deprel"])
+
+PROCESSORS = {"tokenize", "pos", "lemma", "depparse"}
+
+
+def misc_add_stanza_sentences(input_pack: DataPack, sentences, doc_offset: int, processors) -> int:
+    num_tokens = 0
+    for sentence in sentences:
+        Sentence(
+            input_pack,
+            doc_offset + sentence.tokens[0].start_char,
+            doc_offset + sentence.tokens[-1].end_char,
+        )
+
+        tokens: List[Token] = []
+        if "tokenize" in processors:
+            for word in sentence.words:
+                misc = word.misc.split("|")
+
+                t_start = -1
+                t_end = -1
+                for m in misc:
+                    k, v = m.split("=")
+                    if k == "start_char":
+                        t_start = int(v)
+                    elif k == "end_char":
+                        t_end = int(v)
+
+                if t_start < 0 or t_end < 0:
+                    raise ValueError("Cannot determine word start or end for " "stanfordnlp.")
+
+                token = Token(input_pack, doc_offset + t_start, doc_offset + t_end)
+
+                if "pos" in processors:
+                    token.pos = word.pos
+                    token.ud_xpos = word.xpos
+
+                if "lemma" in processors:
+                    token.lemma = word.lemma
+
+                tokens.append(token)
+
+        if "depparse" in processors:
+            for token, word in zip(tokens, sentence.words):
+                child = token
+                parent = tokens[word.head - 1]
+                relation_entry = Dependency(input_pack, parent, child)
+                relation_entry.rel_type = word.deprel
+
+        num_tokens += len(tokens)
+    return num_tokens
+
+
+def synthetic_sentences(num_tokens: int, rng: random.Random):
+    """
+    sentences of 5 to 40 words of 4 characters separated by one space
+    """
+    sentences = []
+    position = 0
+    remaining = num_tokens
+    while remaining > 0:
+        length = min(remaining, rng.randint(5, 40))
+        tokens = []
+        for i in range(length):
+            start, end = position, position + 4
+            word = FakeWord(
+                f"start_char={start}|end_char={end}", "NOUN", "NN", "word", rng.randint(0, length), "dep"
+            )
+            tokens.append(FakeToken(start, end, [word]))
+            position = end + 1
+        sentences.append(FakeSentence(tokens, [token.words[0] for token in tokens]))
+        remaining -= length
+    return sentences, position
+
+
+def timed(fn, sentences, text_length: int):
+    pack = DataPack()
+    pack.set_text(" " * text_length)
+    start = time.perf_counter()
+    fn(pack, sentences, 0, PROCESSORS)
+    return pack, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark creating pack entries from stanza output")
+    parser.add_argument("-tokens", type=int, default=50000, help="number of tokens")
+    parser.add_argument("-seed", type=int, default=31, help="random seed")
+    args = parser.parse_args()
+
+    sentences, text_length = synthetic_sentences(args.tokens, random.Random(args.seed))
+
+    misc_pack, misc_elapsed = timed(misc_add_stanza_sentences, sentences, text_length)
+    fast_pack, fast_elapsed = timed(add_stanza_sentences, sentences, text_length)
+
+    misc_tokens = [(t.begin, t.end, t.pos, t.lemma) for t in misc_pack.get(Token)]
+    fast_tokens = [(t.begin, t.end, t.pos, t.lemma) for t in fast_pack.get(Token)]
+    assert misc_tokens == fast_tokens
+
+    print(f"{args.tokens} tokens in {len(sentences)} sentences")
+    for name, elapsed in [("word.misc", misc_elapsed), ("token offsets", fast_elapsed)]:
+        print(f"{name:>15}: {elapsed / args.tokens * 10000 * 1000:.1f} ms per 10k tokens")
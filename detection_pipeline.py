@@ -1,42 +1,77 @@
 import os
+import time
 import argparse
-import spacy
+import hashlib
+import logging
+import multiprocessing
 from pathlib import Path
-import yaml
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
-from forte.pipeline import Pipeline
-from forte.processors.writers import PackNameJsonPackWriter
-from forte.processors import CoNLLNERPredictor
-from forte.common.configuration import Config
+import tools.lexicons as lexicons
+from tools.idf_table import IDF_TABLE
+from readers.manifest import DetectionManifest, hash_files
+from utils import set_logging, StartupProfiler
 
-from processors.combined_processor import LemmaJunNombankOpenIEEventDetector
-from processors.stanfordnlp_processor import StandfordNLPProcessor
-from readers.event_reader import DocumentReaderJson
+# the NLP libraries take tens of seconds to import, they are imported
+# when the pipeline is built so that `--help` and argument errors are instant
+if TYPE_CHECKING:
+    from forte.pipeline import Pipeline
 
-from utils import set_logging
 
-if __name__ == "__main__":
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    parse a shard specification of the form `i/N` (0 <= i < N)
+    """
+    shard_index, num_shards = [int(x) for x in shard.split("/")]
+    if not 0 <= shard_index < num_shards:
+        raise argparse.ArgumentTypeError(f"invalid shard: {shard}")
+    return shard_index, num_shards
 
-    parser = argparse.ArgumentParser(description="run detection pipeline")
-    parser.add_argument(
-        "--dir",
-        type=Path,
-        default="sample_wikinews",
-        help="input directory path, assumes json files under json/",
-    )
-    parser.add_argument(
-        "--coling2018",
-        type=Path,
-        default="sample_wikinews/coling2018_out",
-        help="path to events extracted using Jun's open-domain event extraction model",
-    )
 
-    args = parser.parse_args()
+def detection_version(args) -> str:
+    """
+    version of everything besides the input documents that the packs depend on:
+    lexicons, model configuration, detector code and options
+    """
+    sources = sorted(Path("processors").glob("*.py")) + sorted(Path("readers").glob("*.py"))
+    files = [
+        lexicons.EVENT_LEMMAS,
+        lexicons.NOMBANK_PROPOSITIONS,
+        lexicons.REPORTING_VERBS,
+        lexicons.STATIVE_VERBS,
+        lexicons.SHIFTLIST,
+        IDF_TABLE,
+        "configs/ner_config_model.yml",
+    ] + sources
+    options = f"spacy=en_core_web_sm|use_pack_parse={args.use_pack_parse}"
+    return hashlib.sha1(f"{hash_files(files)}|{options}".encode("utf-8")).hexdigest()[:16]
 
-    nlp = spacy.load("en_core_web_sm")
-    ner_config_model = yaml.safe_load(open("configs/ner_config_model.yml", "r"))
 
-    set_logging()
+def build_pipeline(
+    args, shard_index: int = 0, num_shards: int = 1, profiler: StartupProfiler = None
+) -> "Pipeline":
+    profiler = profiler or StartupProfiler()
+
+    with profiler.step("import forte"):
+        import yaml
+        from forte.pipeline import Pipeline
+        from forte.processors.writers import PackNameJsonPackWriter
+        from forte.processors import CoNLLNERPredictor
+        from forte.common.configuration import Config
+    with profiler.step("import stanza"):
+        from processors.stanfordnlp_processor import StandfordNLPProcessor, StandfordNLPBatchProcessor
+    with profiler.step("import allennlp"):
+        from processors.openie_processor import OpenIEBatchPredictor
+    with profiler.step("import spacy"):
+        import spacy
+    with profiler.step("import event detector"):
+        from processors.combined_processor import LemmaJunNombankOpenIEEventDetector
+        from readers.event_reader import DocumentReaderJson, DocumentReaderJsonl
+        from processors.archive_writer import ArchivePackWriter
+
+    with profiler.step("load spacy en_core_web_sm"):
+        nlp = spacy.load("en_core_web_sm")
+    ner_config_model = yaml.safe_load(open("configs/ner_config_model.yml", "r"))
 
     # file paths
     coling2018_path = args.coling2018
@@ -44,37 +79,219 @@ if __name__ == "__main__":
     # In the first pipeline, we simply add events and some annotations.
     detection_pipeline = Pipeline()
 
-    # Read raw text.
-    detection_pipeline.set_reader(DocumentReaderJson())
+    # Read raw text, only the documents of this shard.
+    reader = DocumentReaderJsonl() if args.input_format == "jsonl" else DocumentReaderJson()
+    detection_pipeline.set_reader(reader, {"shard_index": shard_index, "num_shards": num_shards})
 
-    # Call stanfordnlp.
-    detection_pipeline.add(StandfordNLPProcessor())
+    # Call stanfordnlp, on several documents at once if asked.
+    if args.stanza_batch_docs > 1:
+        detection_pipeline.add(
+            profiler.time_initialize(StandfordNLPBatchProcessor()),
+            {"batcher": {"batch_size": args.stanza_batch_docs}},
+        )
+    else:
+        detection_pipeline.add(profiler.time_initialize(StandfordNLPProcessor()))
 
     # add NER detection
     ner_config = Config({}, default_hparams=None)
     ner_config.add_hparam("config_model", ner_config_model)
-    detection_pipeline.add(CoNLLNERPredictor(), config=ner_config)
+    detection_pipeline.add(profiler.time_initialize(CoNLLNERPredictor()), config=ner_config)
+
+    # Run OpenIE on sentences batched across documents.
+    openie_cache = str(args.openie_cache) if args.openie_cache else None
+    detection_pipeline.add(
+        profiler.time_initialize(OpenIEBatchPredictor()),
+        {"cache_path": openie_cache, "batcher": {"max_tokens": args.openie_max_tokens}},
+    )
 
     # Call the event detector.
     detection_pipeline.add(
-        LemmaJunNombankOpenIEEventDetector(jun_output=coling2018_path, tokenizer=nlp)
+        profiler.time_initialize(LemmaJunNombankOpenIEEventDetector(jun_output=coling2018_path, tokenizer=nlp)),
+        {"cache_path": openie_cache, "use_pack_parse": args.use_pack_parse},
     )
 
     # Write out the events.
-    input_path = args.dir / "json"
     output_path = args.dir / "packs"
-    output_path.mkdir(exist_ok=True)
 
-    detection_pipeline.add(
-        PackNameJsonPackWriter(),
-        {
-            "output_dir": str(output_path),
-            "indent": 2,
-            "overwrite": True,
-            "drop_record": True,
-        },
-    )
+    if args.pack_format == "archive":
+        # one archive per shard, the pack readers read all archives of the directory
+        detection_pipeline.add(
+            ArchivePackWriter(),
+            {
+                "output_dir": str(output_path),
+                "archive_name": f"shard-{shard_index}-of-{num_shards}",
+                "drop_record": True,
+            },
+        )
+    else:
+        detection_pipeline.add(
+            PackNameJsonPackWriter(),
+            {
+                "output_dir": str(output_path),
+                "indent": 2,
+                "overwrite": True,
+                "drop_record": True,
+            },
+        )
+
+    return detection_pipeline
+
+
+def run_shard(
+    args, shard_index: int, num_shards: int, file_names: Optional[List[str]] = None
+) -> Tuple[int, int, float]:
+    """
+    run the detection pipeline over one shard of the input documents (of `file_names` if given),
+    returns (shard index, number of documents, processing time in seconds)
+    """
+    set_logging()
+    profiler = StartupProfiler(args.profile_startup)
+
+    with profiler.step("import torch"):
+        import torch
+
+    if args.workers > 1:
+        # avoid oversubscribing the cores with per-process torch thread pools
+        torch.set_num_threads(max(1, os.cpu_count() // args.workers))
 
+    detection_pipeline = build_pipeline(args, shard_index, num_shards, profiler)
     detection_pipeline.initialize()
+    profiler.report()
+
+    start_time = time.time()
+    num_docs = 0
+    if args.input_format == "jsonl":
+        documents = detection_pipeline.process_dataset(str(args.dir / "jsonl"))
+    else:
+        documents = detection_pipeline.process_dataset(str(args.dir / "json"), file_names)
+    for _ in documents:
+        num_docs += 1
+    elapsed = time.time() - start_time
+
+    detection_pipeline.finish()
+
+    return shard_index, num_docs, elapsed
+
+
+def report_throughput(results: List[Tuple[int, int, float]], num_shards: int):
+    for shard_index, num_docs, elapsed in results:
+        docs_per_sec = num_docs / elapsed if elapsed > 0 else 0.0
+        logging.info(
+            f"shard {shard_index}/{num_shards}: {num_docs} docs in {elapsed:.1f}s ({docs_per_sec:.2f} docs/sec)"
+        )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="run detection pipeline")
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default="sample_wikinews",
+        help="input directory path, assumes json files under json/ (or JSONL shards under jsonl/)",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="one json file per document, or JSONL shards (optionally .gz/.zst compressed) with an `id` field",
+    )
+    parser.add_argument(
+        "--coling2018",
+        type=Path,
+        default="sample_wikinews/coling2018_out",
+        help="path to events extracted using Jun's open-domain event extraction model",
+    )
+    parser.add_argument(
+        "--pack-format",
+        choices=["json", "archive"],
+        default="json",
+        help="write one indented json file per pack, or compressed pack archives (one per shard) under packs/",
+    )
+    parser.add_argument(
+        "--stanza-batch-docs",
+        type=int,
+        default=1,
+        help="number of documents parsed together by stanza, 1 parses each document on its own",
+    )
+    parser.add_argument(
+        "--openie-max-tokens",
+        type=int,
+        default=2048,
+        help="token budget of a batch of sentences sent to the OpenIE model",
+    )
+    parser.add_argument(
+        "--openie-cache",
+        type=Path,
+        default=None,
+        help="sqlite file caching OpenIE predictions across runs, e.g. data/openie_cache.sqlite3",
+    )
+    parser.add_argument(
+        "--use-pack-parse",
+        action="store_true",
+        help="let the event detector reuse the stanza tokens and dependencies instead of parsing again with spaCy",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process the documents whose inputs, lexicons or models changed since the last run "
+        "(recorded in packs_manifest.json)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="log the time spent importing each library and loading each model",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes, each loads the models once and processes one shard",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="only process shard i/N of the input documents in this process (e.g. 0/4)",
+    )
+
+    args = parser.parse_args()
+    if args.incremental and args.input_format != "json":
+        parser.error("--incremental fingerprints one json file per document, it needs --input-format json")
+
+    set_logging()
+
+    (args.dir / "packs").mkdir(exist_ok=True)
+
+    file_names = None
+    if args.incremental:
+        manifest = DetectionManifest(args.dir / "packs_manifest.json", detection_version(args))
+        fingerprints = manifest.fingerprints(args.dir / "json", args.coling2018)
+        file_names = manifest.changed(fingerprints)
+        logging.info(f"incremental run: {len(file_names)} of {len(fingerprints)} documents changed")
+
+    if args.shard is not None:
+        shard_index, num_shards = args.shard
+        results = [run_shard(args, shard_index, num_shards, file_names)]
+    elif args.workers > 1:
+        num_shards = args.workers
+        # spawn instead of fork, the model libraries do not survive a fork well
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            results = pool.starmap(run_shard, [(args, i, num_shards, file_names) for i in range(num_shards)])
+    else:
+        num_shards = 1
+        results = [run_shard(args, 0, 1, file_names)]
+
+    report_throughput(results, num_shards)
 
-    detection_pipeline.run(str(input_path))
+    if args.incremental:
+        # only record the documents of the shards which ran to completion; shards stride over
+        # the full sorted listing, so that shard jobs started after others updated the manifest
+        # still split the documents the same way
+        changed = set(file_names)
+        processed: Dict[str, str] = {}
+        for shard_index, _, _ in results:
+            for f in list(fingerprints)[shard_index::num_shards]:
+                if f in changed:
+                    processed[f] = fingerprints[f]
+        manifest.update(processed)
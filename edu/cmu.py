@@ -26,6 +26,7 @@ __all__ = [
     "Question",
     "CorefQuestion",
     "SuggestionQuestion",
+    "QuestionSetReference",
     "CrossEventRelation",
     "TitleSpan",
     "DateSpan",
@@ -99,6 +100,21 @@ class SuggestionQuestion(Question):
         super().__init__(pack)
 
 
+@dataclass
+class QuestionSetReference(MultiPackGeneric):
+    """
+    Reference to a versioned set of questions shared by all multipacks, resolved into the questions by readers.
+    Attributes:
+        version (Optional[str])
+    """
+
+    version: Optional[str]
+
+    def __init__(self, pack: MultiPack):
+        super().__init__(pack)
+        self.version: Optional[str] = None
+
+
 @dataclass
 class CrossEventRelation(CrossDocEventRelation):
     """
@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.abspath(".."))
 
 from forte.data.data_pack import DataPack
 from amt_data_utils import custom_sort
+from readers.pack_store import read_packs
 
 
 def get_pack_dict(packs: Iterator[str]) -> Dict[str, DataPack]:
@@ -25,15 +26,6 @@ def get_pack_dict(packs: Iterator[str]) -> Dict[str, DataPack]:
     return name2pack
 
 
-def read_packs(dir_path: Path) -> Dict[str, DataPack]:
-    name2pack = {}
-    for pack_path in tqdm(dir_path.iterdir()):
-        with open(pack_path, "r") as rf:
-            pack: DataPack = DataPack.deserialize(rf.read())
-            name2pack[pack.pack_name] = pack
-    return name2pack
-
-
 def get_corrected_pack(pack_name: str, stave_db_path: str, project_name: str = None) -> str:
     conn = sqlite3.connect(stave_db_path)
     cursor = conn.cursor()
@@ -3,15 +3,14 @@
 import os
 import argparse
 import itertools
+import logging
+import multiprocessing
+import shutil
 from pathlib import Path
+from typing import Dict, List, Tuple
 
-from forte.pipeline import Pipeline
-from forte.processors.writers import PackNameMultiPackWriter
-
-from processors.coref_propose import SameLemmaSuggestionProvider
-from processors.evidence_questions import QuestionCreator
-from readers.event_reader import TwoDocumentPackReader
-from utils import set_logging
+from readers.pair_clusters import doc_name, order_pairs_by_cluster
+from utils import set_logging, StartupProfiler
 
 
 def read_doc_pairs(inp_path, max_size: int, out_dir: Path):
@@ -32,34 +31,54 @@ def read_doc_pairs(inp_path, max_size: int, out_dir: Path):
     return doc_pairs
 
 
-if __name__ == "__main__":
-
-    parser = argparse.ArgumentParser(description="generate MultiPack using pre-defined document pairs")
-    parser.add_argument("--dir", type=Path, default="data", help="source directory path for Packs")
-    parser.add_argument("--doc-pairs", type=str, help="path to the file with document pairs")
-    parser.add_argument("--clique-threshold", type=int, default=4, help="max size of clique to use")
-    parser.add_argument("--overwrite", action="store_true", help="overwrite existing multipacks")
+def run_pairs(args, pairs: List[Tuple[str, str]], output_path: Path, profiler: StartupProfiler = None):
+    """
+    build, question and write the multipacks of `pairs` under `output_path`
+    """
+    profiler = profiler or StartupProfiler()
 
-    args = parser.parse_args()
+    # imported here, forte takes long to import
+    with profiler.step("import forte"):
+        from forte.pipeline import Pipeline
+        from forte.processors.writers import PackNameMultiPackWriter
 
-    set_logging()
-
-    # reading pre-selected document pairs
-    pairs = read_doc_pairs(args.doc_pairs, args.clique_threshold, args.dir)
-    print(f"# document pairs: {len(pairs)}")
+        from processors.coref_propose import (
+            SameLemmaSuggestionProvider,
+            SameHeadLemmaSuggestionProvider,
+            NormalizedNuggetSuggestionProvider,
+        )
+        from processors.evidence_questions import QuestionCreator
+        from readers.event_reader import TwoDocumentPackReader
 
     pair_pipeline = Pipeline()
-    pair_pipeline.set_reader(TwoDocumentPackReader())
+    pair_pipeline.set_reader(TwoDocumentPackReader(), {"cache_size_mb": args.pack_cache_mb})
 
     # Create event relation suggestions
-    # pair_pipeline.add(SameLemmaSuggestionProvider())
+    suggestion_providers = {
+        "text": SameLemmaSuggestionProvider,
+        "head-lemma": SameHeadLemmaSuggestionProvider,
+        "nugget": NormalizedNuggetSuggestionProvider,
+    }
+    if args.suggestions in suggestion_providers:
+        pair_pipeline.add(suggestion_providers[args.suggestions]())
+    elif args.suggestions == "embedding":
+        # imported here, only this provider needs torch and transformers
+        from processors.embedding_suggestion import EmbeddingSuggestionProvider
+
+        pair_pipeline.add(
+            EmbeddingSuggestionProvider(),
+            {
+                "top_k": args.embedding_top_k,
+                "threshold": args.embedding_threshold,
+                "cache_dir": str(args.dir / "embeddings"),
+            },
+        )
 
     # Create coreference questions
-    pair_pipeline.add(QuestionCreator())
+    pair_pipeline.add(QuestionCreator(), {"shared_questions": args.shared_questions})
 
     # Write out the events.
     input_path = args.dir / "packs"
-    output_path = args.dir / "multipacks"
     output_path.mkdir(exist_ok=True)
 
     pair_pipeline.add(
@@ -67,5 +86,150 @@ if __name__ == "__main__":
         {"output_dir": str(output_path), "indent": 2, "overwrite": args.overwrite, "drop_record": True,},
     )
 
-    pair_pipeline.initialize()
+    with profiler.step("initialize pipeline"):
+        pair_pipeline.initialize()
+    profiler.report()
     pair_pipeline.run(str(input_path), pairs)
+
+
+def run_worker(args, clusters: List[List[Tuple[str, str]]], worker_path: Path):
+    set_logging()
+    run_pairs(args, [pair for cluster in clusters for pair in cluster], worker_path)
+
+
+def partition_clusters(clusters: List[List[Tuple[str, str]]], num_workers: int) -> List[List[int]]:
+    """
+    assign whole clusters to workers, largest first to the least loaded worker,
+    returns the cluster indices of each worker in the original cluster order
+    """
+    loads = [0] * num_workers
+    assignment: List[List[int]] = [[] for _ in range(num_workers)]
+    for idx in sorted(range(len(clusters)), key=lambda i: len(clusters[i]), reverse=True):
+        worker = loads.index(min(loads))
+        assignment[worker].append(idx)
+        loads[worker] += len(clusters[idx])
+    return [sorted(indices) for indices in assignment]
+
+
+def merge_worker_outputs(
+    output_path: Path, worker_paths: List[Path], clusters: List[List[Tuple[str, str]]], overwrite: bool
+):
+    """
+    move the files written by the workers into `output_path` and merge their index files,
+    with the lines of each cluster in the serial order of the clusters.
+    Clusters do not share documents, so each index line belongs to one cluster,
+    found from the name of the pack or multipack it points to.
+    Pack ids are kept: member packs keep the ids they were read with, and forte gives
+    new multipacks random (uuid4) ids, so the workers do not share an id counter.
+    The merge fails if an id still points to two different files.
+    """
+    name2cluster: Dict[str, int] = {}
+    for idx, cluster in enumerate(clusters):
+        for doc1, doc2 in cluster:
+            name1, name2 = doc_name(doc1), doc_name(doc2)
+            name2cluster[name1] = name2cluster[name2] = idx
+            name2cluster[f"pair_{name1}_and_{name2}"] = idx
+
+    # index file name -> cluster -> lines, read before anything is moved
+    index_lines: Dict[str, Dict[int, List[str]]] = {}
+    id2path: Dict[str, str] = {}
+    for worker_path in worker_paths:
+        for index_path in sorted(worker_path.glob("*.idx")):
+            with open(index_path) as rf:
+                for line in rf:
+                    # paths joined with the output directory point into the worker directory
+                    line = line.replace(str(worker_path), str(output_path))
+                    pack_id, path = line.rstrip("\n").split("\t")
+                    if id2path.setdefault(pack_id, path) != path:
+                        raise ValueError(f"pack id {pack_id} is used by {id2path[pack_id]} and {path}")
+                    cluster = name2cluster.get(doc_name(path), len(clusters))
+                    index_lines.setdefault(index_path.name, {}).setdefault(cluster, []).append(line)
+
+    for worker_path in worker_paths:
+        for root, _, files in os.walk(worker_path):
+            for f in files:
+                source = Path(root) / f
+                if Path(root) == worker_path and f.endswith(".idx"):
+                    continue
+
+                target = output_path / source.relative_to(worker_path)
+                if target.exists() and not overwrite:
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, target)
+        shutil.rmtree(worker_path)
+
+    for f, cluster_lines in index_lines.items():
+        with open(output_path / f, "w") as wf:
+            for cluster in sorted(cluster_lines):
+                wf.writelines(cluster_lines[cluster])
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="generate MultiPack using pre-defined document pairs")
+    parser.add_argument("--dir", type=Path, default="data", help="source directory path for Packs")
+    parser.add_argument("--doc-pairs", type=str, help="path to the file with document pairs")
+    parser.add_argument("--clique-threshold", type=int, default=4, help="max size of clique to use")
+    parser.add_argument("--overwrite", action="store_true", help="overwrite existing multipacks")
+    parser.add_argument(
+        "--suggestions",
+        choices=["none", "text", "head-lemma", "nugget", "embedding"],
+        default="none",
+        help="suggest cross-document relations between mentions with the same text, head lemma or normalized nugget,"
+        " or with similar contextual embeddings",
+    )
+    parser.add_argument(
+        "--embedding-top-k", type=int, default=3, help="max embedding suggestions per mention of the first document"
+    )
+    parser.add_argument(
+        "--embedding-threshold", type=float, default=0.8, help="min cosine similarity of an embedding suggestion"
+    )
+    parser.add_argument(
+        "--shared-questions",
+        action="store_true",
+        help="store a reference to the versioned question set in each multipack instead of the questions;"
+        " Stave does not resolve the reference, keep the inline questions for Stave annotation",
+    )
+    parser.add_argument(
+        "--pack-cache-mb", type=int, default=1024, help="memory bound of the deserialized pack cache, in MB of serialized packs"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of worker processes, each writes the multipacks of whole clusters"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="log the time spent importing forte and initializing the pipeline"
+    )
+
+    args = parser.parse_args()
+
+    set_logging()
+
+    # reading pre-selected document pairs
+    pairs = read_doc_pairs(args.doc_pairs, args.clique_threshold, args.dir)
+    print(f"# document pairs: {len(pairs)}")
+
+    output_path = args.dir / "multipacks"
+
+    if args.workers > 1:
+        clusters = order_pairs_by_cluster(pairs)
+        assignment = partition_clusters(clusters, args.workers)
+        worker_paths = [output_path / f".worker-{i}" for i in range(args.workers)]
+        output_path.mkdir(exist_ok=True)
+        for worker_path in worker_paths:
+            # left over by an interrupted run
+            shutil.rmtree(worker_path, ignore_errors=True)
+        logging.info(f"{len(clusters)} clusters over {args.workers} workers")
+
+        # spawn instead of fork, forte and the models do not survive a fork well
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            pool.starmap(
+                run_worker,
+                [
+                    (args, [clusters[idx] for idx in indices], worker_path)
+                    for indices, worker_path in zip(assignment, worker_paths)
+                ],
+            )
+        merge_worker_outputs(output_path, worker_paths, clusters, args.overwrite)
+    else:
+        run_pairs(args, pairs, output_path, StartupProfiler(args.profile_startup))
@@ -4,25 +4,14 @@ from pathlib import Path
 import shutil
 from itertools import combinations
 import numpy as np
-from tqdm import tqdm
-from typing import Dict
 
 from tinydb import TinyDB, where
 
-from forte.data.data_pack import DataPack
 from ft.onto.base_ontology import Sentence
 from edu.cmu import EventMention
 
 from amt_data_utils import custom_sort
-
-
-def read_packs(dir_path: Path) -> Dict[str, DataPack]:
-    name2pack = {}
-    for pack_path in tqdm(dir_path.iterdir()):
-        with open(pack_path, "r") as rf:
-            pack: DataPack = DataPack.deserialize(rf.read())
-            name2pack[pack.pack_name] = pack
-    return name2pack
+from readers.pack_store import read_packs
 
 
 def prepare_batch(args):
@@ -7,7 +7,6 @@ from argparse import ArgumentParser
 from typing import Dict, Iterator
 from itertools import combinations
 from pathlib import Path
-from tqdm import tqdm
 
 import sqlite3
 from tinydb import TinyDB, where
@@ -17,6 +16,7 @@ from forte.data.multi_pack import MultiPack
 from ft.onto.base_ontology import Sentence
 
 from amt_data_utils import custom_sort
+from readers.pack_store import read_packs as read_packs_dir
 
 
 def get_reward(sent_count):
@@ -76,15 +76,6 @@ def isAssigned(doc_group, round_table):
     return True
 
 
-def read_packs_dir(dir_path: str) -> Dict[str, DataPack]:
-    name2pack = {}
-    for pack_path in tqdm(dir_path.iterdir()):
-        with open(pack_path, "r") as rf:
-            pack: DataPack = DataPack.deserialize(rf.read())
-            name2pack[pack.pack_name] = pack
-    return name2pack
-
-
 def assign_rounds(args):
     # loading files from multidoc stave db
     multipacks = load_multipacks(args.stave_db_path)
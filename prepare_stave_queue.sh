@@ -46,6 +46,7 @@ elif [ "$MODE" == "multi" ]; then
 
     # write multipacks
     # add --overwrite option to overwrite existing multipacks
+    # no --shared-questions: Stave needs the questions inline in the multipacks
     python pair_pipeline.py \
         --dir $PACK_OUT \
         --doc-pairs $DOC_GROUPS \
@@ -0,0 +1,51 @@
+"""
+Write packs into a pack archive (readers/pack_store.py) instead of one json file per pack.
+"""
+import os
+
+from forte.common.configuration import Config
+from forte.common.resources import Resources
+from forte.data.data_pack import DataPack
+from forte.processors.base import PackProcessor
+
+from readers.pack_store import ARCHIVE_SUFFIX, PackArchiveBuilder
+
+__all__ = [
+    "ArchivePackWriter",
+]
+
+
+class ArchivePackWriter(PackProcessor):
+    """
+    append every pack to the archive `{output_dir}/{archive_name}.packs`,
+    the index of the archive is written when the pipeline finishes
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.builder = None
+
+    def initialize(self, resources: Resources, configs: Config):
+        super().initialize(resources, configs)
+        os.makedirs(self.configs.output_dir, exist_ok=True)
+        self.builder = PackArchiveBuilder(
+            os.path.join(self.configs.output_dir, self.configs.archive_name + ARCHIVE_SUFFIX)
+        )
+
+    @classmethod
+    def default_configs(cls):
+        """
+        output_dir: directory of the archive
+        archive_name: file name of the archive, e.g. one per shard
+        drop_record: drop the creation records of the pack before writing it
+        """
+        config = super().default_configs()
+        config.update({"output_dir": None, "archive_name": "packs", "drop_record": True})
+        return config
+
+    def _process(self, input_pack: DataPack):
+        self.builder.add(input_pack.pack_name, input_pack.serialize(drop_record=self.configs.drop_record))
+
+    def finish(self, resource: Resources):
+        self.builder.close()
+        super().finish(resource)
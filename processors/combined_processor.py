@@ -1,15 +1,15 @@
 import logging
-import json
 import math
-import gzip
 import os
 import sys
+from bisect import bisect_left
 from pathlib import Path
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
-from allennlp.predictors.predictor import Predictor
 import tools.brat_tool as brat_tool
+from tools.idf_table import load_idf_table
+import tools.lexicons as lexicons
 
 from forte.data.data_pack import DataPack
 from forte.processors.base import PackProcessor
@@ -17,15 +17,40 @@ from ft.onto.base_ontology import Token, Sentence
 from forte.common.configuration import Config
 from forte.common.resources import Resources
 from edu.cmu import EventMention, BodySpan
-
-MODEL2URL = {
-    "openie": "https://storage.googleapis.com/allennlp-public-models/openie-model.2020.03.26.tar.gz",
-    "srl": "https://storage.googleapis.com/allennlp-public-models/bert-base-srl-2020.03.24.tar.gz",
-}
+from processors.lemma_matcher import load_lemma_matcher
+from processors.event_merging import merge_event_candidates, find_phrase_pairs, detect_phrases
+from processors.pack_doc import PackDoc
+from processors.openie_processor import OPENIE_PREDICTIONS, load_predictor, load_prediction_cache, predict_sentences
 
 logger = logging.getLogger(__name__)
 
 
+class AnnotationIndex:
+    """
+    Offset index over the annotations of a pack, built once per pack so that
+    the candidate lookups do not scan `input_pack.annotations` every time.
+    - span2annotation: (begin, end) -> first annotation (in pack order) with that span
+    - begins: sorted begin offsets, parallel to `annotations`
+    """
+
+    def __init__(self, input_pack: DataPack):
+        # pack annotations are sorted by span
+        self.annotations = list(input_pack.annotations)
+        self.begins = [annotation.begin for annotation in self.annotations]
+        self.span2annotation: Dict[Tuple[int, int], Any] = {}
+        for annotation in self.annotations:
+            self.span2annotation.setdefault((annotation.begin, annotation.end), annotation)
+
+    def get(self, begin: int, end: int) -> Optional[Any]:
+        return self.span2annotation.get((begin, end))
+
+    def window_start(self, begin: int) -> int:
+        """
+        position of the first annotation which begins at or after `begin`
+        """
+        return bisect_left(self.begins, begin)
+
+
 class LemmaJunNombankOpenIEEventDetector(PackProcessor):
     """
     This is the combined method:
@@ -40,26 +65,19 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
     def __init__(self, jun_output: Path, tokenizer):
 
         # lemma-match
-        with open('./tools/event_lemma.txt', encoding="utf-8") as f:
-            event_lemmas = f.read().splitlines()
-            self.event_lemma_list_single = [elm for elm in event_lemmas if " " not in elm]
-            self.event_lemma_list_sequence = [elm.split(" ") for elm in event_lemmas if " " in elm]
-        self.event_lemma_list_sequence = sorted(self.event_lemma_list_sequence, key=lambda x: len(x), reverse=True)
+        self.lemma_matcher = load_lemma_matcher()
 
         # nombank
-        with open('./tools/pruned_nombank_propositions_chain_10.json', 'r') as f:
-            self.nombank_lemma_list = json.load(f)
+        self.nombank_lemma_list = lexicons.load_nombank_lemmas()
 
         # reporting verbs
-        with open('./tools/reporting_verbs.txt', 'r') as f:
-            self.reporting_verbs = [x.strip() for x in f.readlines()]
+        self.reporting_verbs = lexicons.load_word_list(lexicons.REPORTING_VERBS)
 
         # stative verbs
-        with open('./tools/stative_verbs.txt', 'r') as f:
-            self.stative_verbs = [x.strip() for x in f.readlines()]
+        self.stative_verbs = lexicons.load_word_list(lexicons.STATIVE_VERBS)
 
         # auxiliary verbs
-        self.auxiliary_verbs = ['will', 'would', 'could', 'can', 'might', 'may', 'must', 'should', 'have']
+        self.auxiliary_verbs = lexicons.AUXILIARY_VERBS
 
         # path to the output of Jun's code
         self.coling2018_event_output_path = jun_output
@@ -67,13 +85,11 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
         # spacy: ToDo) update to use built-in tokenizer
         self.tokenizer = tokenizer
 
-        # document frequency look-up table
-        with gzip.open('./tools/idf_table.json.gz', 'rt', encoding='utf-8') as f:
-            self.df_table = json.load(f)
+        # document frequency look-up table, memory-mapped and shared by the detectors of a process
+        self.df_table = load_idf_table()
 
         # manually gathering shiftlist(blacklist)
-        with open('./tools/shiftlist.txt', 'r') as f:
-            self.shiftlist = [x.strip() for x in f.readlines()]
+        self.shiftlist = lexicons.load_word_list(lexicons.SHIFTLIST)
 
 
     def initialize(self, resources: Resources, configs: Config):
@@ -82,17 +98,20 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
         """
         super().initialize(resources, configs)
 
-        model_url = MODEL2URL[configs.model]
-        self.predictor = Predictor.from_path(model_url)
+        self.predictor = load_predictor(resources, configs.model)
+        self.cache = load_prediction_cache(resources, configs)
 
     @classmethod
     def default_configs(cls):
         """
         default config for AllenNLPEventProcessor
             uses OpenIE model to identify event mentions
+            cache_path: sqlite file to cache predictions in, no caching if None
+            use_pack_parse: read the tokens, lemmas and dependencies of StandfordNLPProcessor
+                from the pack instead of parsing the coling2018 text with spaCy
         """
         config = super().default_configs()
-        config.update({"model": "openie"})
+        config.update({"model": "openie", "cache_path": None, "use_pack_parse": False})
         return config
 
     def _process(self, input_pack: DataPack):
@@ -112,22 +131,21 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
 
         # event detection with lemma-match (domain-specific lemma + nombank) method:
         # sequence match
-        for ev_seq in self.event_lemma_list_sequence:
-            sub_idx_list = self.subfinder(body_lemmas, ev_seq)
-            for sub_idx in sub_idx_list:
-                if all([not body_events[idx] for idx in sub_idx]):
-                    event_begin = body_tokens[sub_idx[0]].begin
-                    event_end = body_tokens[sub_idx[-1]].end
+        for sub_idx in self.lemma_matcher.find_sequences(body_lemmas):
+            if all([not body_events[idx] for idx in sub_idx]):
+                event_begin = body_tokens[sub_idx[0]].begin
+                event_end = body_tokens[sub_idx[-1]].end
+                ev_seq = body_lemmas[sub_idx[0]:sub_idx[-1] + 1]
 
-                    detected_events_lemma_match.append({'begin': event_begin, 'end': event_end, 'source': 'L', 'nugget': ev_seq})
+                detected_events_lemma_match.append({'begin': event_begin, 'end': event_end, 'source': 'L', 'nugget': ev_seq})
 
-                    for idx in sub_idx:
-                        body_events[idx] = True
+                for idx in sub_idx:
+                    body_events[idx] = True
 
         # single word match
         for token, token_is_event in zip(body_tokens, body_events):
 
-            if (not token_is_event) and (token.lemma in self.event_lemma_list_single):
+            if (not token_is_event) and (token.lemma in self.lemma_matcher.single_lemmas):
                 detected_events_lemma_match.append({'begin': token.begin, 'end': token.end, 'source': 'L', 'nugget': token.lemma})
 
             if (not token_is_event) and (token.lemma in self.nombank_lemma_list):
@@ -140,9 +158,12 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
         # load txt 
         with open(self.coling2018_event_output_path / f"{input_pack.pack_name}.txt", 'r', encoding='utf-8') as f:
             txt_data = f.read()
-        # parse text w/ spacy
-        # ToDo: replace spacy tokenizer with Default one (stanfordcorenlp? stanza?).
-        doc = self.tokenizer(txt_data)
+        if self.configs.use_pack_parse:
+            # reuse the stanza parse of the body
+            doc = PackDoc(input_pack, body_offset, self.tokenizer.Defaults.stop_words)
+        else:
+            # parse text w/ spacy
+            doc = self.tokenizer(txt_data)
 
         ann = brat_tool.BratAnnotations(ann_data)
         events = ann.getEventAnnotationList()
@@ -188,8 +209,14 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
             detected_events_coling2018.append({'begin': body_offset + start_pos, 'end': body_offset + end_pos, 'source': 'J', 'nugget': txt})
         
         # check & modify alignment of detected events by coling2018-event
+        index = AnnotationIndex(input_pack)
         for event in detected_events_coling2018:
-            for token in input_pack.annotations:
+            # annotations beginning before `begin - 5` can never match, start from the window
+            for position in range(index.window_start(event['begin'] - 5), len(index.annotations)):
+                token = index.annotations[position]
+                if token.begin > event['begin'] + 5:
+                    # neither this nor any later annotation is in the window
+                    break
                 if (token.begin == event['begin']) and (token.end == event['end']):
                     # span is okay
                     break
@@ -201,15 +228,22 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
                     event['end'] = token.end
 
         # OpenIE
-        sentences, sentences_txt = [], []
-        for sentence in input_pack.get(Sentence):
-            sentences.append(sentence)
-            sentences_txt.append({"sentence": sentence.text})
+        # use the predictions batched across packs by OpenIEBatchPredictor if it is in the pipeline
+        openie_predictions = self.resources.get(OPENIE_PREDICTIONS)
+        if openie_predictions is not None:
+            predictions = openie_predictions.pop(input_pack.pack_name, {})
+        else:
+            predictions = {}
 
-        predictions = self.predictor.predict_batch_json(sentences_txt)
+        sentences = list(input_pack.get(Sentence))
+        missing = [sentence for sentence in sentences if sentence.begin not in predictions]
+        if len(missing) > 0:
+            missing_predictions = predict_sentences(self.predictor, [s.text for s in missing], self.cache)
+            for sentence, prediction in zip(missing, missing_predictions):
+                predictions[sentence.begin] = prediction
 
-        for sentence, prediction in zip(sentences, predictions):
-            detected_events_openie += self.get_event_mentions_openie(input_pack, sentence, prediction)
+        for sentence in sentences:
+            detected_events_openie += self.get_event_mentions_openie(input_pack, sentence, predictions[sentence.begin])
 
 
         # concate all detected events
@@ -218,7 +252,7 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
         # remove not-our-target event candidates
         tmp = list()
         for event in detected_event_candidates:
-            lemma = self.get_lemma(input_pack, event)
+            lemma = self.get_lemma(index, event)
             if (lemma not in self.reporting_verbs) \
                 and (lemma not in self.stative_verbs) \
                 and (lemma not in self.auxiliary_verbs) \
@@ -227,51 +261,10 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
         detected_event_candidates = tmp[:]
 
         # merge redundant
-        detected_events = list()
-        for event in detected_event_candidates:
-            flag_exist = False
-            for existing_event in detected_events:
-                if event['begin'] == existing_event['begin'] and event['end'] == existing_event['end']:
-                    flag_exist = True
-                    existing_event['source'] += event['source']
-                elif existing_event['begin'] <= event['begin'] and event['end'] <= existing_event['end']:
-                    flag_exist = True
-                    existing_event['source'] += event['source']
-                elif event['begin'] <= existing_event['begin'] and existing_event['end'] <= event['end']:
-                    flag_exist = True
-                    existing_event['source'] += event['source']
-            if not flag_exist:
-                detected_events.append(event)
+        detected_events = merge_event_candidates(detected_event_candidates)
 
         # phrase detection
-        detected_events = sorted(detected_events, key=lambda x:x['begin'])
-        replacements = list()
-        skip_idx = list()
-        for idx in range(len(detected_events)-1):
-            if idx in skip_idx:
-                continue
-            # if two consecutive events are next to each other,
-            if int(detected_events[idx+1]['begin']) - int(detected_events[idx]['end']) <= 2:
-                # check dependency
-                for idx_ in range(len(doc)-1):
-                    if doc[idx_].text == detected_events[idx]['nugget'] and doc[idx_+1].text == detected_events[idx+1]['nugget']:
-                        if (doc[idx_].head.text == doc[idx_+1].text) or (doc[idx_].text == doc[idx_+1].head.text):
-                            if doc[idx_].dep_ == 'compound' \
-                                or (doc[idx_].dep_ == 'prt' or doc[idx_+1].dep_ == 'prt'):
-                                new_event = {'begin': detected_events[idx]['begin'],
-                                             'end': detected_events[idx+1]['end'],
-                                             'source': 'P',
-                                             'nugget': detected_events[idx]['nugget']+' '+ detected_events[idx+1]['nugget']}
-                                replacements.append((detected_events[idx], detected_events[idx+1], new_event))
-                                skip_idx.append(idx+1)
-                                break
-        for replacement in replacements:
-            if replacement[0] not in detected_events:
-                logging.info('debug: replacement){} detected_events){}'.format(replacement, detected_events))
-                continue
-            detected_events.remove(replacement[0])
-            detected_events.remove(replacement[1])
-            detected_events.append(replacement[2])
+        detected_events = detect_phrases(detected_events, find_phrase_pairs(doc))
 
         # term frequency calc
         table_word_count = dict()
@@ -291,45 +284,55 @@ class LemmaJunNombankOpenIEEventDetector(PackProcessor):
                 table_word_count[token.lemma_] += 1
 
         # store events + importance(tf-idf) calculation
-        for event in detected_events:
+        nugget_lemmas = self.get_nugget_lemmas(detected_events, doc if self.configs.use_pack_parse else None)
+        for event, lemma in zip(detected_events, nugget_lemmas):
+            evm = EventMention(input_pack, event['begin'], event['end'])
+            evm.event_source = event['source']
             # set the importance score
             if type(event['nugget']) is list:
-                evm = EventMention(input_pack, event['begin'], event['end'])
                 evm.importance = - 2.0
-                evm.event_source = event['source']
-            else:
-                doc = self.tokenizer(event['nugget'])
-                if len(doc) == 1:
-                    lemma = doc[0].lemma_
-                    evm = EventMention(input_pack, event['begin'], event['end'])
-                    evm.event_source = event['source']
-                    if lemma in table_word_count and lemma in self.df_table:
-                        tf = table_word_count[lemma] / len(table_word_count)
-                        idf = len(self.df_table) / self.df_table[lemma]
-                        evm.importance = float('{0:.3g}'.format(tf * math.log(idf)))
-                    else:  # the word not found in tables (including stop words)
-                        evm.importance = - 1.0
-                else:  # multiple words?
-                    evm = EventMention(input_pack, event['begin'], event['end'])
-                    evm.importance = - 1.0
-                    evm.event_source = event['source']
-
-    def subfinder(self, mylist, pattern):
-        matches = []
-        for i in range(len(mylist)):
-            if mylist[i] == pattern[0] and mylist[i:i+len(pattern)] == pattern:
-                matches.append(list(range(i, len(pattern) + i, 1)))
-        return matches
-
-    def get_lemma(self, input_pack: DataPack, event):
+            elif lemma is None:  # multiple words?
+                evm.importance = - 1.0
+            elif lemma in table_word_count and lemma in self.df_table:
+                tf = table_word_count[lemma] / len(table_word_count)
+                idf = len(self.df_table) / self.df_table[lemma]
+                evm.importance = float('{0:.3g}'.format(tf * math.log(idf)))
+            else:  # the word not found in tables (including stop words)
+                evm.importance = - 1.0
+
+    def get_nugget_lemmas(self, events: List[Dict], pack_doc: Optional[PackDoc] = None) -> List[Optional[str]]:
+        """
+        lemma of each single-word nugget, None for lemma sequences and multi-word nuggets.
+        With `pack_doc`, nuggets on token boundaries take the lemmas of the pack tokens,
+        the other nuggets are parsed by spaCy in one batch.
+        """
+        lemmas: List[Optional[str]] = [None] * len(events)
+        to_parse = list()
+        for idx, event in enumerate(events):
+            if type(event['nugget']) is list:
+                continue
+            if pack_doc is not None:
+                tokens = pack_doc.tokens_in_span(event['begin'], event['end'])
+                if tokens is not None:
+                    if len(tokens) == 1:
+                        lemmas[idx] = tokens[0].lemma_
+                    continue
+            to_parse.append(idx)
+
+        docs = self.tokenizer.pipe([events[idx]['nugget'] for idx in to_parse])
+        for idx, doc in zip(to_parse, docs):
+            if len(doc) == 1:
+                lemmas[idx] = doc[0].lemma_
+        return lemmas
+
+    def get_lemma(self, index: AnnotationIndex, event):
         lemma = None
-        for token in input_pack.annotations:
-            if (token.begin == event['begin']) and (token.end == event['end']):
-                try:
-                    lemma = token.lemma
-                except:  # Sentence
-                    lemma = None
-                break
+        token = index.get(event['begin'], event['end'])
+        if token is not None:
+            try:
+                lemma = token.lemma
+            except:  # Sentence
+                lemma = None
         return lemma
 
     def get_event_mentions_openie(
@@ -1,5 +1,11 @@
+import string
+from bisect import bisect_left
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from forte.data.data_pack import DataPack
 from forte.data.multi_pack import MultiPack
 from forte.processors.base import MultiPackProcessor
+from ft.onto.base_ontology import Token, Dependency
 
 from edu.cmu import EventMention, CrossEventRelation
 
@@ -16,19 +22,103 @@ class BaseSuggestionProvider(MultiPackProcessor):
         for evm_i in pack_i.get(EventMention):
             for evm_j in pack_j.get(EventMention):
                 if self.use_this_pair(evm_i, evm_j):
-                    link = CrossEventRelation(input_pack, evm_i, evm_j)
-                    link.rel_type = 'suggested'
-                    input_pack.add_entry(link)
+                    self.add_suggestion(input_pack, evm_i, evm_j)
+
+    def add_suggestion(self, input_pack: MultiPack, evm_i: EventMention, evm_j: EventMention):
+        link = CrossEventRelation(input_pack, evm_i, evm_j)
+        link.rel_type = 'suggested'
+        input_pack.add_entry(link)
 
     def use_this_pair(self, evm_i, evm_j) -> bool:
         raise NotImplementedError
 
 
-class SameLemmaSuggestionProvider(BaseSuggestionProvider):
+class IndexedSuggestionProvider(BaseSuggestionProvider):
     """
-    Mark some example coreference relations using lemma.
+    Base class of suggestion providers which only pair mentions sharing a blocking key.
+    The mentions of the second pack are bucketed by key and each mention of the first
+    pack is joined with its bucket, so the cost scales with the number of matches
+    instead of the number of mention pairs. The pairs are suggested in the same order
+    as by the nested loop, `use_this_pair` can still reject pairs of a bucket.
     """
 
+    def _process(self, input_pack: MultiPack):
+        pack_i = input_pack.get_pack_at(0)
+        pack_j = input_pack.get_pack_at(1)
+
+        buckets: Dict[Hashable, List[EventMention]] = {}
+        for evm_j, key in self.blocking_keys(pack_j):
+            buckets.setdefault(key, []).append(evm_j)
+
+        for evm_i, key in self.blocking_keys(pack_i):
+            for evm_j in buckets.get(key, []):
+                if self.use_this_pair(evm_i, evm_j):
+                    self.add_suggestion(input_pack, evm_i, evm_j)
+
+    def blocking_keys(self, pack: DataPack) -> Iterator[Tuple[EventMention, Hashable]]:
+        """
+        (mention, key) of the mentions of `pack` in pack order, mentions without a key are skipped.
+        Override to precompute per pack information used by the keys.
+        """
+        for evm in pack.get(EventMention):
+            key = self.blocking_key(evm)
+            if key is not None:
+                yield evm, key
+
+    def blocking_key(self, evm: EventMention) -> Optional[Hashable]:
+        raise NotImplementedError
+
     def use_this_pair(self, evm_i, evm_j) -> bool:
-        if evm_i.text == evm_j.text:
-            return True
+        return True
+
+
+class SameLemmaSuggestionProvider(IndexedSuggestionProvider):
+    """
+    Mark some example coreference relations using lemma.
+    """
+
+    def blocking_key(self, evm: EventMention) -> Optional[Hashable]:
+        return evm.text
+
+
+class NormalizedNuggetSuggestionProvider(IndexedSuggestionProvider):
+    """
+    Pair mentions whose nuggets are the same up to case, spacing and surrounding punctuation.
+    """
+
+    def blocking_key(self, evm: EventMention) -> Optional[Hashable]:
+        nugget = " ".join(evm.text.lower().split()).strip(string.punctuation + " ")
+        return nugget if len(nugget) > 0 else None
+
+
+class SameHeadLemmaSuggestionProvider(IndexedSuggestionProvider):
+    """
+    Pair mentions with the same head lemma. The head of a mention is its first token
+    whose dependency head is outside the mention, or its last token without a parse.
+    """
+
+    def blocking_keys(self, pack: DataPack) -> Iterator[Tuple[EventMention, Hashable]]:
+        tokens = list(pack.get(Token))
+        begins = [token.begin for token in tokens]
+        parents = {
+            dependency.get_child().tid: dependency.get_parent().tid
+            for dependency in pack.get(Dependency)
+        }
+
+        for evm in pack.get(EventMention):
+            first = bisect_left(begins, evm.begin)
+            last = bisect_left(begins, evm.end)
+            covered = [token for token in tokens[first:last] if token.end <= evm.end]
+            if len(covered) == 0:
+                continue
+
+            tids = {token.tid for token in covered}
+            head = covered[-1]
+            # without a parse of the mention, no token has a parent and the last one is kept
+            if any(token.tid in parents for token in covered):
+                for token in covered:
+                    if parents.get(token.tid) not in tids:
+                        head = token
+                        break
+            if head.lemma is not None:
+                yield evm, head.lemma
@@ -0,0 +1,195 @@
+"""
+Suggest cross-document relations between event mentions with similar contextual embeddings.
+"""
+import hashlib
+import os
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from forte.common.configuration import Config
+from forte.common.resources import Resources
+from forte.data.data_pack import DataPack
+from forte.data.multi_pack import MultiPack
+from ft.onto.base_ontology import Sentence
+
+from edu.cmu import EventMention
+from processors.coref_propose import BaseSuggestionProvider
+
+__all__ = [
+    "EmbeddingSuggestionProvider",
+]
+
+
+class EmbeddingSuggestionProvider(BaseSuggestionProvider):
+    """
+    Encode every mention once per pack, as the mean of the contextual embeddings of its
+    subwords in its sentence, and suggest for each mention of the first pack the top-k
+    mentions of the second pack with a cosine similarity above a threshold.
+    The similarities of a pair are one matrix product of the normalized vectors.
+    Vectors are cached in memory and, with `cache_dir`, on disk per pack.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tokenizer = None
+        self.model = None
+        # pack name -> (mention spans, vectors)
+        self.vectors: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def initialize(self, resources: Resources, configs: Config):
+        super().initialize(resources, configs)
+
+        key = f"transformers_{configs.model_name}"
+        if not resources.contains(key):
+            model = AutoModel.from_pretrained(configs.model_name)
+            model.eval()
+            resources.update(**{key: (AutoTokenizer.from_pretrained(configs.model_name), model)})
+        self.tokenizer, self.model = resources.get(key)
+
+        if configs.cache_dir is not None:
+            os.makedirs(configs.cache_dir, exist_ok=True)
+
+    @classmethod
+    def default_configs(cls):
+        """
+        model_name: transformers encoder, small enough to run on CPU
+        top_k: max number of suggestions per mention of the first pack
+        threshold: min cosine similarity of a suggestion
+        cache_dir: directory of the per-pack vector cache, no disk cache if None
+        batch_size: sentences encoded together
+        max_length: max subwords per sentence
+        memory_cache_size: number of packs whose vectors are kept in memory
+        """
+        config = super().default_configs()
+        config.update(
+            {
+                "model_name": "sentence-transformers/all-MiniLM-L6-v2",
+                "top_k": 3,
+                "threshold": 0.8,
+                "cache_dir": None,
+                "batch_size": 32,
+                "max_length": 128,
+                "memory_cache_size": 64,
+            }
+        )
+        return config
+
+    def _process(self, input_pack: MultiPack):
+        mentions_i, vectors_i = self.mention_vectors(input_pack.get_pack_at(0))
+        mentions_j, vectors_j = self.mention_vectors(input_pack.get_pack_at(1))
+        if len(mentions_i) == 0 or len(mentions_j) == 0:
+            return
+
+        similarity = vectors_i @ vectors_j.T
+        top_k = min(self.configs.top_k, len(mentions_j))
+        # the top-k columns of every row, then sorted by decreasing similarity
+        candidates = np.argpartition(-similarity, top_k - 1, axis=1)[:, :top_k]
+        for i, row in enumerate(candidates):
+            for j in row[np.argsort(-similarity[i, row], kind="stable")]:
+                if similarity[i, j] >= self.configs.threshold:
+                    self.add_suggestion(input_pack, mentions_i[i], mentions_j[j])
+
+    def use_this_pair(self, evm_i, evm_j) -> bool:
+        return True
+
+    def mention_vectors(self, pack: DataPack) -> Tuple[List[EventMention], np.ndarray]:
+        """
+        mentions of `pack` and their L2-normalized vectors (n, dim)
+        """
+        # the mentions always come from this pack object: the pack reader may
+        # deserialize a pack again, links must not point to an older copy
+        mentions = list(pack.get(EventMention))
+        spans = np.array([[evm.begin, evm.end] for evm in mentions], dtype=np.int64).reshape(-1, 2)
+
+        if pack.pack_name in self.vectors:
+            cached_spans, vectors = self.vectors[pack.pack_name]
+            if np.array_equal(cached_spans, spans):
+                return mentions, vectors
+
+        vectors = self._load_cached(pack.pack_name, spans)
+        if vectors is None:
+            vectors = self._encode(pack, mentions)
+            self._save_cached(pack.pack_name, spans, vectors)
+
+        self.vectors.pop(pack.pack_name, None)
+        if len(self.vectors) >= self.configs.memory_cache_size:
+            # pairs come cluster by cluster, the oldest pack is the least likely to come back
+            self.vectors.pop(next(iter(self.vectors)))
+        self.vectors[pack.pack_name] = (spans, vectors)
+        return mentions, vectors
+
+    def _cache_path(self, pack_name: str) -> str:
+        # vectors of several models can be cached side by side
+        model_key = hashlib.sha1(self.configs.model_name.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.configs.cache_dir, f"{pack_name}.{model_key}.npz")
+
+    def _load_cached(self, pack_name: str, spans: np.ndarray):
+        if self.configs.cache_dir is None or not os.path.exists(self._cache_path(pack_name)):
+            return None
+        with np.load(self._cache_path(pack_name)) as cached:
+            # the mentions or the model changed since the vectors were cached
+            if str(cached["model_name"]) != self.configs.model_name or not np.array_equal(cached["spans"], spans):
+                return None
+            return cached["vectors"]
+
+    def _save_cached(self, pack_name: str, spans: np.ndarray, vectors: np.ndarray):
+        if self.configs.cache_dir is None:
+            return
+        tmp_path = self._cache_path(pack_name) + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, model_name=np.array(self.configs.model_name), spans=spans, vectors=vectors)
+        os.replace(tmp_path, self._cache_path(pack_name))
+
+    def _encode(self, pack: DataPack, mentions: List[EventMention]) -> np.ndarray:
+        dim = self.model.config.hidden_size
+        vectors = np.zeros((len(mentions), dim), dtype=np.float32)
+        if len(mentions) == 0:
+            return vectors
+
+        # context of each mention: its sentence, or the mention itself outside sentences
+        sentences = list(pack.get(Sentence))
+        begins = [sentence.begin for sentence in sentences]
+        contexts: Dict[Tuple[int, int], List[int]] = {}
+        for idx, evm in enumerate(mentions):
+            position = bisect_right(begins, evm.begin) - 1
+            if position >= 0 and sentences[position].end >= evm.end:
+                span = (sentences[position].begin, sentences[position].end)
+            else:
+                span = (evm.begin, evm.end)
+            contexts.setdefault(span, []).append(idx)
+
+        context_spans = list(contexts.keys())
+        text = pack.text
+        for start in range(0, len(context_spans), self.configs.batch_size):
+            batch_spans = context_spans[start:start + self.configs.batch_size]
+            encoded = self.tokenizer(
+                [text[begin:end] for begin, end in batch_spans],
+                padding=True,
+                truncation=True,
+                max_length=self.configs.max_length,
+                return_offsets_mapping=True,
+                return_tensors="pt",
+            )
+            offsets = encoded.pop("offset_mapping").numpy()
+            with torch.no_grad():
+                hidden = self.model(**encoded)[0].numpy()
+            attention = encoded["attention_mask"].numpy().astype(bool)
+
+            for row, context_span in enumerate(batch_spans):
+                context_begin = context_span[0]
+                # special tokens have empty offsets
+                valid = attention[row] & (offsets[row, :, 1] > offsets[row, :, 0])
+                for idx in contexts[context_span]:
+                    evm = mentions[idx]
+                    begin, end = evm.begin - context_begin, evm.end - context_begin
+                    overlap = valid & (offsets[row, :, 0] < end) & (offsets[row, :, 1] > begin)
+                    # a mention truncated away falls back to its whole context
+                    mask = overlap if overlap.any() else valid
+                    if mask.any():
+                        vectors[idx] = hidden[row][mask].mean(axis=0)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
@@ -1,5 +1,3 @@
-import gzip
-import json
 import logging
 import math
 
@@ -8,17 +6,17 @@ from forte.processors.base import PackProcessor
 from ft.onto.base_ontology import Token
 
 import tools.brat_tool as brat_tool
+from tools.idf_table import load_idf_table
+import tools.lexicons as lexicons
 from edu.cmu import EventMention
+from processors.lemma_matcher import load_lemma_matcher
 
 
 class KeywordEventDetector(PackProcessor):
     """
     An example event proposer that propose events based on a dictionary.
     """
-    event_dict = {
-        'bomb', 'detonate', 'kill', 'injure', 'kidnap', 'shootout', 'die',
-        'explode', 'death'
-    }
+    event_dict = lexicons.KEYWORD_EVENT_LEMMAS
 
     def _process(self, pack: DataPack):
         for token in pack.get(Token):
@@ -47,20 +45,13 @@ class LemmaJunNombankEventDetector(PackProcessor):
             tokenizer):
 
         # lemma-match
-        with open(event_lemma_list_filename, encoding="utf-8") as f:
-            event_lemmas = f.read().splitlines()
-            self.event_lemma_list_single = [elm for elm in event_lemmas if
-                                            " " not in elm]
-            self.event_lemma_list_sequence = [elm.split(" ") for elm in
-                                              event_lemmas if " " in elm]
+        self.lemma_matcher = load_lemma_matcher(event_lemma_list_filename)
 
         # nombank
-        with open(nombank_propositions, 'r') as f:
-            self.nombank_lemma_list = json.load(f)
+        self.nombank_lemma_list = lexicons.load_nombank_lemmas(nombank_propositions)
 
         # reporting verbs
-        with open(reporting_verbs, 'r') as f:
-            self.reporting_verbs = [x.strip() for x in f.readlines()]
+        self.reporting_verbs = lexicons.load_word_list(reporting_verbs)
 
         # path to the output of Jun's code
         self.coling2018_event_output_path = jun_output
@@ -68,13 +59,8 @@ class LemmaJunNombankEventDetector(PackProcessor):
         # spacy: to be removed
         self.tokenizer = tokenizer
 
-        # document frequency look-up table
-        with gzip.open(df_file, 'rt', encoding='utf-8') as f:
-            self.df_table = json.load(f)
-
-        self.event_lemma_list_sequence = sorted(self.event_lemma_list_sequence,
-                                                key=lambda x: len(x),
-                                                reverse=True)
+        # document frequency look-up table, memory-mapped and shared by the detectors of a process
+        self.df_table = load_idf_table(df_file)
 
     def _process(self, pack: DataPack):
         print('pack.pack_name {}'.format(pack.pack_name + '.txt'))
@@ -88,21 +74,20 @@ class LemmaJunNombankEventDetector(PackProcessor):
 
         # event detection with lemma-match (domain lemma + nombank) method: 
         # sequence match
-        for ev_seq in self.event_lemma_list_sequence:
-            sub_idx_list = self.subfinder(body_lemmas, ev_seq)
-            for sub_idx in sub_idx_list:
-                if all([not body_events[idx] for idx in sub_idx]):
-                    detected_events_lemma_match.append((body_tokens[
-                                                            sub_idx[0]].begin,
-                                                        body_tokens[
-                                                            sub_idx[-1]].end,
-                                                        'lemma', ev_seq))
-                    for idx in sub_idx:
-                        body_events[idx] = True
+        for sub_idx in self.lemma_matcher.find_sequences(body_lemmas):
+            if all([not body_events[idx] for idx in sub_idx]):
+                ev_seq = body_lemmas[sub_idx[0]:sub_idx[-1] + 1]
+                detected_events_lemma_match.append((body_tokens[
+                                                        sub_idx[0]].begin,
+                                                    body_tokens[
+                                                        sub_idx[-1]].end,
+                                                    'lemma', ev_seq))
+                for idx in sub_idx:
+                    body_events[idx] = True
         # single word match
         for token, token_is_event in zip(body_tokens, body_events):
             if (not token_is_event) and (
-                    token.lemma in self.event_lemma_list_single):
+                    token.lemma in self.lemma_matcher.single_lemmas):
                 detected_events_lemma_match.append(
                     (token.begin, token.end, 'lemma', token.lemma))
             if (not token_is_event) and (
@@ -223,11 +208,3 @@ class LemmaJunNombankEventDetector(PackProcessor):
                         1])  # event[0]: start, event[1]: end
                     evm.importance = - 1.0
                     evm.event_type = event[2]
-
-    def subfinder(self, mylist, pattern):
-        matches = []
-        for i in range(len(mylist)):
-            if mylist[i] == pattern[0] and mylist[
-                                           i:i + len(pattern)] == pattern:
-                matches.append(list(range(i, len(pattern) + i, 1)))
-        return matches
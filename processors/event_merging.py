@@ -0,0 +1,80 @@
+"""
+Merging of event candidates and phrase detection used by the combined event detector.
+Candidates are dicts with `begin`, `end`, `source` and `nugget`.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Set, Tuple
+
+__all__ = [
+    "merge_event_candidates",
+    "find_phrase_pairs",
+    "detect_phrases",
+]
+
+
+def merge_event_candidates(candidates: List[Dict]) -> List[Dict]:
+    """
+    merge identical and nested candidates, `candidates` must be sorted by begin.
+    A candidate equal to, nested in or covering accepted events is dropped and its
+    source is appended to the source of each of those events.
+
+    Accepted events never nest, so both their begins and their ends are strictly
+    increasing. The accepted events related to a new candidate are then the suffix
+    whose end is not before the candidate end, or the last one if it shares the
+    candidate begin, and one bisection finds them.
+    """
+    merged: List[Dict] = []
+    ends: List[int] = []
+    for event in candidates:
+        matches = range(bisect_left(ends, event['end']), len(merged))
+        if len(matches) == 0 and len(merged) > 0 and merged[-1]['begin'] == event['begin']:
+            matches = range(len(merged) - 1, len(merged))
+
+        for idx in matches:
+            merged[idx]['source'] += event['source']
+        if len(matches) == 0:
+            merged.append(event)
+            ends.append(event['end'])
+
+    return merged
+
+
+def find_phrase_pairs(doc) -> Set[Tuple[str, str]]:
+    """
+    collect (text, next text) of the adjacent spaCy tokens in `doc` which are
+    linked by a dependency and form a compound or a verb-particle phrase
+    """
+    pairs = set()
+    for token, next_token in zip(doc, doc[1:]):
+        if (token.head.text == next_token.text) or (token.text == next_token.head.text):
+            if token.dep_ == 'compound' or (token.dep_ == 'prt' or next_token.dep_ == 'prt'):
+                pairs.add((token.text, next_token.text))
+    return pairs
+
+
+def detect_phrases(events: List[Dict], phrase_pairs: Set[Tuple[str, str]]) -> List[Dict]:
+    """
+    replace two events next to each other whose nuggets form a phrase in `phrase_pairs`
+    by a single phrase event (source `P`), `events` must be sorted by begin.
+    The remaining events keep their order and the phrase events are appended.
+    """
+    replaced = set()
+    phrases = list()
+    idx = 0
+    while idx < len(events) - 1:
+        event, next_event = events[idx], events[idx + 1]
+        # if two consecutive events are next to each other,
+        if int(next_event['begin']) - int(event['end']) <= 2 \
+                and isinstance(event['nugget'], str) and isinstance(next_event['nugget'], str) \
+                and (event['nugget'], next_event['nugget']) in phrase_pairs:
+            phrases.append({'begin': event['begin'],
+                            'end': next_event['end'],
+                            'source': 'P',
+                            'nugget': event['nugget'] + ' ' + next_event['nugget']})
+            replaced.update([idx, idx + 1])
+            # the second event cannot start another phrase
+            idx += 2
+        else:
+            idx += 1
+
+    return [event for idx, event in enumerate(events) if idx not in replaced] + phrases
@@ -1,62 +1,134 @@
+from typing import Dict, List, Tuple
+
 from forte.data.multi_pack import MultiPack
 from forte.processors.base import MultiPackProcessor
 
-from edu.cmu import CorefQuestion, SuggestionQuestion
+from edu.cmu import Question, CorefQuestion, SuggestionQuestion, QuestionSetReference
+
+__all__ = [
+    "QUESTION_SETS",
+    "QUESTION_SET_VERSION",
+    "QuestionCreator",
+    "QuestionResolver",
+    "create_questions",
+    "resolve_questions",
+]
+
+# versioned question sets, a published version must never change,
+# add a new version instead: multipacks in shared mode only store the version
+QUESTION_SETS: Dict[str, Dict[str, List[Tuple[str, List[str]]]]] = {
+    "1": {
+        "coref": [
+            (
+                'Place: Do you think the two events '
+                'happen at the same place?',
+                [
+                    'Exactly the same', 'The places overlap',
+                    'Not at all', 'Cannot determine',
+                ],
+            ),
+            (
+                'Time: Do you think the two events '
+                'happen at the same time?',
+                [
+                    'Exactly the same', 'They overlap in time',
+                    'Not at all', 'Cannot determine',
+                ],
+            ),
+            (
+                'Participants: Do you think the two events'
+                ' have the same participants?',
+                [
+                    'Exactly the same', 'They share some participants',
+                    'Not at all', 'Cannot determine',
+                ],
+            ),
+            (
+                'Inclusion: Do you think one of the events'
+                ' is part of the other?',
+                [
+                    'Yes, the left event is part of right one',
+                    'Yes, the right event is part of left one',
+                    'No, they are exactly the same',
+                    'Cannot determine',
+                ],
+            ),
+        ],
+        "suggestion": [
+            (
+                'You consider these two to be different, '
+                'could you tell us why?',
+                [
+                    'One event is part of the other event.',
+                    'Some event details (e.g. time, location, participants) '
+                    'are conflicting.',
+                    'There is no enough information.',
+                    'The two events are completely un-related.'
+                    'Other reasons',
+                ],
+            ),
+        ],
+    },
+}
+
+QUESTION_SET_VERSION = "1"
+
+
+def create_questions(input_pack: MultiPack, version: str = QUESTION_SET_VERSION):
+    """
+    add the questions of the question set `version` to the multipack
+    """
+    question_set = QUESTION_SETS[version]
+    for question_type, key in [(CorefQuestion, "coref"), (SuggestionQuestion, "suggestion")]:
+        for question_body, options in question_set[key]:
+            q = question_type(input_pack)
+            q.question_body = question_body
+            q.options = list(options)
+            input_pack.add_entry(q)
+
+
+def resolve_questions(input_pack: MultiPack):
+    """
+    add the questions of the question set referenced by a multipack written in shared mode,
+    so that they can be added to CrossEventRelation.coref_questions
+    """
+    references = list(input_pack.get(QuestionSetReference))
+    # the questions may be resolved already
+    if len(references) > 0 and len(list(input_pack.get(Question))) == 0:
+        create_questions(input_pack, references[0].version)
 
 
 class QuestionCreator(MultiPackProcessor):
     """
         Create questions for the coreference tasks.
+        In shared mode, only a reference to the question set is stored in the
+        multipack, QuestionResolver (or `resolve_questions`) restores the questions.
+        Stave does not resolve the reference: multipacks for Stave keep inline questions.
+    """
+
+    def _process(self, input_pack: MultiPack):
+        if self.configs.shared_questions:
+            reference = QuestionSetReference(input_pack)
+            reference.version = self.configs.question_set_version
+            input_pack.add_entry(reference)
+        else:
+            create_questions(input_pack, self.configs.question_set_version)
+
+    @classmethod
+    def default_configs(cls):
+        """
+        shared_questions: store a reference to the question set instead of the questions
+        question_set_version: version of the question set in QUESTION_SETS
+        """
+        config = super().default_configs()
+        config.update({"shared_questions": False, "question_set_version": QUESTION_SET_VERSION})
+        return config
+
+
+class QuestionResolver(MultiPackProcessor):
+    """
+        Restore the questions of multipacks written with shared questions.
     """
 
     def _process(self, input_pack: MultiPack):
-        q = CorefQuestion(input_pack)
-        q.question_body = 'Place: Do you think the two events ' \
-                          'happen at the same place?'
-        q.options = [
-            'Exactly the same', 'The places overlap',
-            'Not at all', 'Cannot determine',
-        ]
-        input_pack.add_entry(q)
-
-        q = CorefQuestion(input_pack)
-        q.question_body = 'Time: Do you think the two events ' \
-                          'happen at the same time?'
-        q.options = [
-            'Exactly the same', 'They overlap in time',
-            'Not at all', 'Cannot determine',
-        ]
-        input_pack.add_entry(q)
-
-        q = CorefQuestion(input_pack)
-        q.question_body = 'Participants: Do you think the two events' \
-                          ' have the same participants?'
-        q.options = [
-            'Exactly the same', 'They share some participants',
-            'Not at all', 'Cannot determine',
-        ]
-        input_pack.add_entry(q)
-
-        q = CorefQuestion(input_pack)
-        q.question_body = 'Inclusion: Do you think one of the events' \
-                          ' is part of the other?'
-        q.options = [
-            'Yes, the left event is part of right one',
-            'Yes, the right event is part of left one',
-            'No, they are exactly the same',
-            'Cannot determine',
-        ]
-        input_pack.add_entry(q)
-
-        q = SuggestionQuestion(input_pack)
-        q.question_body = 'You consider these two to be different, ' \
-                          'could you tell us why?'
-        q.options = [
-            'One event is part of the other event.',
-            'Some event details (e.g. time, location, participants) '
-            'are conflicting.',
-            'There is no enough information.',
-            'The two events are completely un-related.'
-            'Other reasons',
-        ]
-        input_pack.add_entry(q)
+        resolve_questions(input_pack)
@@ -0,0 +1,65 @@
+"""
+Lemma-match lexicon compiled once for the event detectors.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from tools.lexicons import EVENT_LEMMAS, load_event_lemmas
+
+__all__ = [
+    "LemmaMatcher",
+    "load_lemma_matcher",
+]
+
+# trie key marking the end of a lemma sequence, holds the sequence rank
+_RANK = object()
+
+
+class LemmaMatcher:
+    """
+    Matches the event lemma list (e.g. tools/event_lemma.txt) against the lemmas of a document.
+    - single_lemmas: frozenset of one-word event lemmas
+    - multi-word lemmas are stored in a trie, ranked longest first and then in list order
+    """
+
+    def __init__(self, event_lemmas: Iterable[str]):
+        event_lemmas = list(event_lemmas)
+        self.single_lemmas = frozenset(elm for elm in event_lemmas if " " not in elm)
+
+        sequences = [elm.split(" ") for elm in event_lemmas if " " in elm]
+        self.sequences = sorted(sequences, key=lambda x: len(x), reverse=True)
+
+        self.trie: Dict = {}
+        for rank, sequence in enumerate(self.sequences):
+            node = self.trie
+            for lemma in sequence:
+                node = node.setdefault(lemma, {})
+            # a repeated sequence keeps its first rank
+            node.setdefault(_RANK, rank)
+
+    def find_sequences(self, lemmas: List[str]) -> List[List[int]]:
+        """
+        find all occurrences of the multi-word lemmas in `lemmas` with one walk of
+        the trie per position. Returns the token indices of each occurrence, in the
+        order of the sequence ranks and then of the positions, so that occurrences
+        found earlier take precedence when they overlap.
+        """
+        matches: List[Tuple[int, int, int]] = []
+        for start in range(len(lemmas)):
+            node = self.trie
+            for end in range(start, len(lemmas)):
+                node = node.get(lemmas[end])
+                if node is None:
+                    break
+                if _RANK in node:
+                    matches.append((node[_RANK], start, end + 1))
+
+        return [list(range(start, end)) for _, start, end in sorted(matches)]
+
+
+@lru_cache(maxsize=None)
+def load_lemma_matcher(path: str = EVENT_LEMMAS) -> LemmaMatcher:
+    """
+    matcher of the event lemma list at `path`, compiled once per process
+    """
+    return LemmaMatcher(load_event_lemmas(path))
@@ -3,23 +3,33 @@ Adapted from `forte/forte/processors/allennlp_processors.py`
 """
 
 import logging
+import hashlib
+import json
+import sqlite3
+import zlib
 
 from allennlp.predictors.predictor import Predictor
 
 from forte.data.data_pack import DataPack
+from forte.data.batchers import ProcessingBatcher
+from forte.data.data_utils_io import batch_instances
 from forte.processors.base import PackProcessor
+from forte.processors.base.batch_processor import FixedSizeBatchProcessor
 from ft.onto.base_ontology import Token, Sentence
 from forte.common.configuration import Config
 from forte.common.resources import Resources
 
 from edu.cmu import EventMention
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
     "AllenNLPEventProcessor",
+    "OpenIEBatchPredictor",
+    "OpenIEPredictionCache",
+    "TokenBudgetDataPackBatcher",
 ]
 
 MODEL2URL = {
@@ -27,6 +37,92 @@ MODEL2URL = {
     "srl": "https://storage.googleapis.com/allennlp-public-models/bert-base-srl-2020.03.24.tar.gz",
 }
 
+# resource key of the predictions made by OpenIEBatchPredictor,
+# {pack_name: {sentence begin: prediction}}
+OPENIE_PREDICTIONS = "openie_predictions"
+
+
+def load_predictor(resources: Resources, model: str) -> Predictor:
+    """
+    load the AllenNLP predictor once and share it through the pipeline resources
+    """
+    key = f"allennlp_{model}_predictor"
+    if not resources.contains(key):
+        resources.update(**{key: Predictor.from_path(MODEL2URL[model])})
+    return resources.get(key)
+
+
+class OpenIEPredictionCache:
+    """
+    On-disk cache of AllenNLP predictions, keyed by the hash of the model url
+    and the sentence text. Only the `verbs` (verb and tags) and `words` of a
+    prediction are stored, as compressed json in a sqlite table.
+    """
+
+    def __init__(self, path: str, model_url: str):
+        self.model_url = model_url
+        # several worker processes may share the cache
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS predictions (key BLOB PRIMARY KEY, value BLOB)")
+        self.conn.commit()
+
+    def _key(self, sentence: str) -> bytes:
+        return hashlib.sha1(f"{self.model_url}\n{sentence}".encode("utf-8")).digest()
+
+    def get(self, sentence: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT value FROM predictions WHERE key=?", (self._key(sentence),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put_many(self, sentences: List[str], predictions: List[Dict[str, Any]]):
+        rows = []
+        for sentence, prediction in zip(sentences, predictions):
+            value = {
+                "verbs": [{"verb": v["verb"], "tags": v["tags"]} for v in prediction["verbs"]],
+                "words": prediction["words"],
+            }
+            rows.append((self._key(sentence), zlib.compress(json.dumps(value).encode("utf-8"))))
+        self.conn.executemany("INSERT OR REPLACE INTO predictions (key, value) VALUES (?, ?)", rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def load_prediction_cache(resources: Resources, configs: Config) -> Optional[OpenIEPredictionCache]:
+    """
+    open the prediction cache at `configs.cache_path` once and share it through the pipeline resources,
+    returns None if no cache is configured
+    """
+    if configs.cache_path is None:
+        return None
+    key = f"allennlp_prediction_cache_{configs.cache_path}"
+    if not resources.contains(key):
+        resources.update(**{key: OpenIEPredictionCache(configs.cache_path, MODEL2URL[configs.model])})
+    return resources.get(key)
+
+
+def predict_sentences(
+    predictor: Predictor, sentences: List[str], cache: Optional[OpenIEPredictionCache] = None
+) -> List[Dict[str, Any]]:
+    """
+    run the predictor on `sentences`, sentences found in the cache skip the model
+    """
+    if cache is None:
+        return predictor.predict_batch_json([{"sentence": sentence} for sentence in sentences])
+
+    predictions = [cache.get(sentence) for sentence in sentences]
+    missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if len(missing) > 0:
+        missing_sentences = [sentences[i] for i in missing]
+        missing_predictions = predictor.predict_batch_json([{"sentence": sentence} for sentence in missing_sentences])
+        cache.put_many(missing_sentences, missing_predictions)
+        for i, prediction in zip(missing, missing_predictions):
+            predictions[i] = prediction
+    return predictions
+
 
 class AllenNLPEventProcessor(PackProcessor):
     """
@@ -36,28 +132,25 @@ class AllenNLPEventProcessor(PackProcessor):
     def initialize(self, resources: Resources, configs: Config):
         super().initialize(resources, configs)
 
-        model_url = MODEL2URL[configs.model]
-        self.predictor = Predictor.from_path(model_url)
+        self.predictor = load_predictor(resources, configs.model)
+        self.cache = load_prediction_cache(resources, configs)
 
     @classmethod
     def default_configs(cls):
         """
         default config for AllenNLPEventProcessor
             uses OpenIE model to identify event mentions
+            cache_path: sqlite file to cache predictions in, no caching if None
         """
         config = super().default_configs()
-        config.update({"model": "openie"})
+        config.update({"model": "openie", "cache_path": None})
         return config
 
     def _process(self, input_pack: DataPack):
         # TODO: handle existing entries?
 
-        sentences, sentences_txt = [], []
-        for sentence in input_pack.get(Sentence):
-            sentences.append(sentence)
-            sentences_txt.append({"sentence": sentence.text})
-
-        predictions = self.predictor.predict_batch_json(sentences_txt)
+        sentences = list(input_pack.get(Sentence))
+        predictions = predict_sentences(self.predictor, [sentence.text for sentence in sentences], self.cache)
 
         for sentence, prediction in zip(sentences, predictions):
             self._create_event_mentions(input_pack, sentence, prediction)
@@ -97,3 +190,112 @@ class AllenNLPEventProcessor(PackProcessor):
                 evm = EventMention(input_pack, offset + event_begin, offset + event_end)
                 evm.importance = 1.0
                 evm.event_type = "OpenIE"
+
+
+class TokenBudgetDataPackBatcher(ProcessingBatcher[DataPack]):
+    """
+    Batch contexts across data packs until the number of tokens in the batch
+    reaches `max_tokens`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_tokens = -1
+        self.num_tokens = 0
+        self.batch_is_full = False
+
+    def initialize(self, config: Config):
+        super().initialize(config)
+        self.max_tokens = config.max_tokens
+        self.num_tokens = 0
+        self.batch_is_full = False
+
+    def _should_yield(self) -> bool:
+        return self.batch_is_full
+
+    def flush(self):
+        self.num_tokens = 0
+        yield from super().flush()
+
+    def _get_data_batch(self, data_pack: DataPack, context_type, requests=None, offset: int = 0):
+        instances: List[Dict] = []
+        for data in data_pack.get_data(context_type, requests, offset):
+            instances.append(data)
+            self.num_tokens += len(data["Token"]["text"])
+            if self.num_tokens >= self.max_tokens:
+                self.batch_is_full = True
+                yield batch_instances(instances), len(instances)
+                instances = []
+                self.batch_is_full = False
+                self.num_tokens = 0
+
+        # the rest stays in the batcher until more packs come in
+        if len(instances) > 0:
+            yield batch_instances(instances), len(instances)
+
+    @classmethod
+    def default_configs(cls):
+        return {"max_tokens": 2048}
+
+
+class OpenIEBatchPredictor(FixedSizeBatchProcessor):
+    """
+    Run the AllenNLP model over sentences gathered from many packs, so the
+    predictor is called with large batches instead of once per document.
+    The predictions are not added to the packs, they are kept in the pipeline
+    resources under `OPENIE_PREDICTIONS` for the event detector.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.predictor = None
+
+    @staticmethod
+    def _define_context():
+        return Sentence
+
+    @staticmethod
+    def _define_input_info():
+        return {Token: []}
+
+    @staticmethod
+    def define_batcher() -> ProcessingBatcher:
+        return TokenBudgetDataPackBatcher()
+
+    def initialize(self, resources: Resources, configs: Config):
+        super().initialize(resources, configs)
+
+        self.predictor = load_predictor(resources, configs.model)
+        self.cache = load_prediction_cache(resources, configs)
+        if not resources.contains(OPENIE_PREDICTIONS):
+            resources.update(**{OPENIE_PREDICTIONS: {}})
+
+    @classmethod
+    def default_configs(cls):
+        """
+        model: AllenNLP model to use, see MODEL2URL
+        cache_path: sqlite file to cache predictions in, no caching if None
+        batcher.max_tokens: token budget of a batch
+        """
+        config = super().default_configs()
+        config.update({"model": "openie", "cache_path": None})
+        return config
+
+    def predict(self, data_batch: Dict) -> Dict:
+        sentences = data_batch["context"]
+        lengths = [len(tokens) for tokens in data_batch["Token"]["text"]]
+
+        # sort by length to cut padding inside the model
+        order = sorted(range(len(sentences)), key=lambda i: lengths[i])
+        sorted_predictions = predict_sentences(self.predictor, [sentences[i] for i in order], self.cache)
+
+        predictions: List[Any] = [None] * len(sentences)
+        for i, prediction in zip(order, sorted_predictions):
+            predictions[i] = prediction
+
+        return {"prediction": predictions, "offset": data_batch["offset"]}
+
+    def pack(self, pack: DataPack, inputs: Dict) -> None:
+        pack_predictions = self.resources.get(OPENIE_PREDICTIONS).setdefault(pack.pack_name, {})
+        for offset, prediction in zip(inputs["offset"], inputs["prediction"]):
+            pack_predictions[offset] = prediction
@@ -0,0 +1,119 @@
+"""
+spaCy-like view over the tokens, lemmas and dependencies that StandfordNLPProcessor
+already stored in a pack, so that the event detectors do not parse the text again.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+from forte.data.data_pack import DataPack
+from ft.onto.base_ontology import Token, Sentence, Dependency
+
+__all__ = [
+    "PackToken",
+    "PackSentence",
+    "PackDoc",
+]
+
+# UD relations named differently by spaCy
+UD2SPACY_DEP = {
+    "compound:prt": "prt",
+    "root": "ROOT",
+}
+
+
+class PackToken:
+    """
+    a pack Token with the spaCy token attributes used by the detectors:
+    text, lemma_, pos_, dep_, is_stop and head (the token itself for a root)
+    begin and end are pack offsets
+    """
+
+    __slots__ = ["text", "lemma_", "pos_", "dep_", "is_stop", "head", "begin", "end"]
+
+    def __init__(self, token: Token, stop_words: Iterable[str]):
+        self.text = token.text
+        self.lemma_ = token.lemma
+        self.pos_ = token.pos
+        self.dep_ = ""
+        self.is_stop = self.text.lower() in stop_words
+        self.head = self
+        self.begin = token.begin
+        self.end = token.end
+
+
+class PackSentence:
+    """
+    a pack Sentence, start_char and end_char are relative to the body like in a spaCy doc
+    """
+
+    def __init__(self, start_char: int, end_char: int, tokens: List[PackToken]):
+        self.start_char = start_char
+        self.end_char = end_char
+        self.tokens = tokens
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+class PackDoc:
+    """
+    the body of a pack as a sequence of PackToken, with `sents` like a spaCy doc.
+    body_offset: begin of the BodySpan, sentence offsets are relative to it
+    stop_words: e.g. `nlp.Defaults.stop_words` of the spaCy model the default mode uses
+    """
+
+    def __init__(self, input_pack: DataPack, body_offset: int, stop_words: Iterable[str]):
+        pack_tokens = list(input_pack.get(Token))
+        self.tokens = [PackToken(token, stop_words) for token in pack_tokens]
+        self.begins = [token.begin for token in self.tokens]
+
+        tid2token: Dict[int, PackToken] = {
+            pack_token.tid: token for pack_token, token in zip(pack_tokens, self.tokens)
+        }
+        for dependency in input_pack.get(Dependency):
+            child = tid2token.get(dependency.get_child().tid)
+            parent = tid2token.get(dependency.get_parent().tid)
+            if child is None or parent is None:
+                continue
+            child.dep_ = UD2SPACY_DEP.get(dependency.rel_type, dependency.rel_type)
+            # the stanza processor links a root to the last token, spaCy heads a root with itself
+            if child.dep_ != "ROOT":
+                child.head = parent
+
+        # tokens and sentences are both sorted, assign the tokens in one sweep
+        self.sents: List[PackSentence] = []
+        position = 0
+        for sentence in input_pack.get(Sentence):
+            position = bisect_left(self.begins, sentence.begin, position)
+            end = bisect_left(self.begins, sentence.end, position)
+            self.sents.append(
+                PackSentence(
+                    sentence.begin - body_offset,
+                    sentence.end - body_offset,
+                    self.tokens[position:end],
+                )
+            )
+            position = end
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, item):
+        return self.tokens[item]
+
+    def tokens_in_span(self, begin: int, end: int) -> Optional[List[PackToken]]:
+        """
+        tokens exactly covering the pack span [begin, end), None if the span
+        does not start and end on token boundaries
+        """
+        first = bisect_left(self.begins, begin)
+        last = bisect_left(self.begins, end)
+        if first == last or self.tokens[first].begin != begin or self.tokens[last - 1].end != end:
+            return None
+        return self.tokens[first:last]
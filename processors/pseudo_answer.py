@@ -9,6 +9,7 @@ from forte.data.multi_pack import MultiPack
 from forte.processors.base import MultiPackProcessor
 
 from edu.cmu import CrossEventRelation, CorefQuestion, SuggestionQuestion
+from processors.evidence_questions import resolve_questions
 
 
 class ExampleQuestionAnswerer(MultiPackProcessor):
@@ -17,6 +18,9 @@ class ExampleQuestionAnswerer(MultiPackProcessor):
     """
 
     def _process(self, input_pack: MultiPack):
+        # multipacks written with shared questions only reference them
+        resolve_questions(input_pack)
+
         i = 0
         link: CrossEventRelation
 
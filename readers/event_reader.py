@@ -1,8 +1,16 @@
 import os
-from typing import Iterator, Tuple, List, Any
+import io
+import gzip
+from collections import OrderedDict
+from typing import Iterator, Tuple, List, Any, Optional, Dict
 import json
 import logging
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 from forte.data.base_pack import PackType
 from forte.data.data_pack import DataPack
 from forte.data.multi_pack import MultiPack
@@ -10,10 +18,8 @@ from forte.data.base_reader import PackReader
 from forte.data.base_reader import MultiPackReader
 
 from edu.cmu import TitleSpan, DateSpan, BodySpan
-
-
-def doc_name(doc_path):
-    return os.path.basename(doc_path).split(".")[0]
+from readers.pack_store import PackStore
+from readers.pair_clusters import doc_name, order_pairs_by_cluster
 
 
 def doc_text(doc_path):
@@ -21,6 +27,38 @@ def doc_text(doc_path):
         return d.read()
 
 
+def document_pack(pack_name: str, data: Dict[str, Any]) -> DataPack:
+    """
+    build the pack of a news article with its title, date and body spans
+    """
+    pack: DataPack = DataPack()
+    pack.pack_name = pack_name
+
+    text = ""
+
+    title = data.get("title", None)
+    title_str = f"Title: {title}"
+    title_offset, title_length = len(text), len(title_str)
+    text += f"{title_str}\n\n"
+
+    date = data.get("date", None)
+    date_str = f"Date: {date}"
+    date_offset, date_length = len(text), len(date_str)
+    text += f"{date_str}\n\n"
+
+    body = data["text"]
+    body_offset, body_length = len(text), len(body)
+    text += f"{body}"
+
+    pack.set_text(text)
+
+    TitleSpan(pack, title_offset, title_offset + title_length)
+    DateSpan(pack, date_offset, date_offset + date_length)
+    BodySpan(pack, body_offset, body_offset + body_length)
+
+    return pack
+
+
 class DocumentReader(PackReader):
     def _collect(self, data_dir: str) -> Iterator[Any]:
         for f in os.listdir(data_dir):
@@ -34,66 +72,187 @@ class DocumentReader(PackReader):
             yield pack
 
 
+class DataPackCache:
+    """
+    LRU cache of deserialized DataPacks keyed by (file, mtime, pack name), bounded by
+    the total size of the serialized packs, a proxy of their size in memory
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.packs: "OrderedDict[Tuple[str, float, str], Tuple[DataPack, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, store: PackStore, pack_name: str) -> DataPack:
+        key = store.source(pack_name) + (pack_name,)
+        if key in self.packs:
+            self.hits += 1
+            self.packs.move_to_end(key)
+            return self.packs[key][0]
+
+        self.misses += 1
+        serialized = store.get_serialized(pack_name)
+        pack: DataPack = DataPack.deserialize(serialized)
+        self.packs[key] = (pack, len(serialized))
+        self.num_bytes += len(serialized)
+        while self.num_bytes > self.max_bytes and len(self.packs) > 1:
+            _, (_, size) = self.packs.popitem(last=False)
+            self.num_bytes -= size
+        return pack
+
+
 class TwoDocumentPackReader(MultiPackReader):
+    """
+    MultiPacks of document pairs, the packs are read by name from a pack store
+    (a directory of json packs or of pack archives, see readers/pack_store.py).
+    Deserialized packs are cached and the pairs sharing documents are read one after
+    the other, so that each pack is deserialized about once.
+    """
+
     def _collect(
         self, data_dir: str, pairs: List[Tuple[str, str]]
-    ) -> Iterator[Tuple[Tuple[str, str, str], Tuple[str, str, str]]]:
-        for doc1, doc2 in pairs:
-            pack_path1 = os.path.join(data_dir, doc1)
-            pack_path2 = os.path.join(data_dir, doc2)
-
-            if not os.path.isfile(pack_path1):
-                logging.warning("missing file: %s" % pack_path1)
-            elif not os.path.isfile(pack_path2):
-                logging.warning("missing file: %s" % pack_path2)
-            else:
-                yield pack_path1, pack_path2
+    ) -> Iterator[Tuple[str, str]]:
+        self.store = PackStore(data_dir)
+        self.cache = DataPackCache(self.configs.cache_size_mb * 1024 * 1024)
+
+        for cluster in order_pairs_by_cluster(pairs):
+            for doc1, doc2 in cluster:
+                name1, name2 = doc_name(doc1), doc_name(doc2)
+
+                if name1 not in self.store:
+                    logging.warning("missing file: %s" % os.path.join(data_dir, doc1))
+                elif name2 not in self.store:
+                    logging.warning("missing file: %s" % os.path.join(data_dir, doc2))
+                else:
+                    yield name1, name2
 
-    def _parse_pack(self, doc_path_pair: Tuple[str, str]) -> Iterator[MultiPack]:
+        logging.info(f"pack cache: {self.cache.misses} packs deserialized, {self.cache.hits} reused")
+
+    def _parse_pack(self, doc_name_pair: Tuple[str, str]) -> Iterator[MultiPack]:
         mp = MultiPack()
-        doc1, doc2 = doc_path_pair
+        doc1, doc2 = doc_name_pair
 
-        with open(doc1) as doc1_f, open(doc2) as doc2_f:
-            p1: DataPack = DataPack.deserialize(doc1_f.read())
-            p2: DataPack = DataPack.deserialize(doc2_f.read())
-            mp.add_pack_(p1)
-            mp.add_pack_(p2)
-            mp.pack_name = f"pair_{p1.pack_name}_and_{p2.pack_name}"
+        p1: DataPack = self.cache.get(self.store, doc1)
+        p2: DataPack = self.cache.get(self.store, doc2)
+        mp.add_pack_(p1)
+        mp.add_pack_(p2)
+        mp.pack_name = f"pair_{p1.pack_name}_and_{p2.pack_name}"
 
         yield mp
 
+    @classmethod
+    def default_configs(cls):
+        """
+        cache_size_mb: bound of the pack cache, in MB of serialized packs
+        """
+        config = super().default_configs()
+        config.update({"cache_size_mb": 1024})
+        return config
+
 
 class DocumentReaderJson(PackReader):
-    def _collect(self, data_dir: str) -> Iterator[Any]:
-        for f in os.listdir(data_dir):
+    def _collect(self, data_dir: str, file_names: Optional[List[str]] = None) -> Iterator[Any]:
+        """
+        file_names: only read these files of `data_dir`, e.g. the documents changed since the last run
+        """
+        # sort the listing so that every shard sees the same document order; the shard of a
+        # file depends on the full listing only, not on which files are selected
+        files = sorted(os.listdir(data_dir))[self.configs.shard_index :: self.configs.num_shards]
+        if file_names is not None:
+            file_names = set(file_names)
+            files = [f for f in files if f in file_names]
+        for f in files:
             yield os.path.join(data_dir, f)
 
     def _parse_pack(self, input_file: str) -> Iterator[PackType]:
         with open(input_file) as f:
-            pack: DataPack = DataPack()
-            pack.pack_name = os.path.basename(input_file).split(".")[0]
+            yield document_pack(os.path.basename(input_file).split(".")[0], json.load(f))
 
-            text = ""
-            data = json.load(f)
+    @classmethod
+    def default_configs(cls):
+        """
+        num_shards, shard_index: only read every `num_shards`-th document of the
+            sorted input listing, starting from `shard_index`
+        """
+        config = super().default_configs()
+        config.update({"num_shards": 1, "shard_index": 0})
+        return config
 
-            title = data.get("title", None)
-            title_str = f"Title: {title}"
-            title_offset, title_length = len(text), len(title_str)
-            text += f"{title_str}\n\n"
 
-            date = data.get("date", None)
-            date_str = f"Date: {date}"
-            date_offset, date_length = len(text), len(date_str)
-            text += f"{date_str}\n\n"
+def open_jsonl(path: str) -> io.TextIOBase:
+    """
+    open a plain, gzip (.gz) or zstd (.zst) compressed JSONL file for reading
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"reading {path} requires the zstandard package")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
 
-            body = data["text"]
-            body_offset, body_length = len(text), len(body)
-            text += f"{body}"
 
-            pack.set_text(text)
+def read_line_range(path: str, begin: int, end: int) -> Iterator[str]:
+    """
+    lines of a plain file which start in the byte range [begin, end)
+    """
+    with open(path, "rb") as f:
+        if begin > 0:
+            # the line starting at `begin` is the one after the previous newline
+            f.seek(begin - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode("utf-8")
 
-            TitleSpan(pack, title_offset, title_offset + title_length)
-            DateSpan(pack, date_offset, date_offset + date_length)
-            BodySpan(pack, body_offset, body_offset + body_length)
 
-            yield pack
+class DocumentReaderJsonl(PackReader):
+    """
+    Stream documents from JSONL shards, one json object per line with the same
+    fields as the files read by DocumentReaderJson plus the document id.
+    Plain files are split into byte ranges so that each shard reads a disjoint
+    part of every file, compressed files are assigned to shards as a whole.
+    """
+
+    def _collect(self, data_path: str) -> Iterator[Any]:
+        """
+        data_path: a JSONL file (.jsonl, .jsonl.gz, .jsonl.zst) or a directory of them
+        """
+        if os.path.isdir(data_path):
+            paths = [os.path.join(data_path, f) for f in sorted(os.listdir(data_path)) if ".jsonl" in f]
+        else:
+            paths = [data_path]
+
+        shard_index, num_shards = self.configs.shard_index, self.configs.num_shards
+        for file_index, path in enumerate(paths):
+            if path.endswith(".gz") or path.endswith(".zst"):
+                # compressed streams cannot be entered at a byte offset
+                if file_index % num_shards == shard_index:
+                    with open_jsonl(path) as f:
+                        yield from f
+            else:
+                size = os.path.getsize(path)
+                begin = size * shard_index // num_shards
+                end = size * (shard_index + 1) // num_shards
+                yield from read_line_range(path, begin, end)
+
+    def _parse_pack(self, line: str) -> Iterator[PackType]:
+        if len(line.strip()) == 0:
+            return
+        data = json.loads(line)
+        yield document_pack(str(data[self.configs.id_field]), data)
+
+    @classmethod
+    def default_configs(cls):
+        """
+        id_field: field of the document id, used as the pack name
+        num_shards, shard_index: only read the part `shard_index` of `num_shards`
+            of the input (byte ranges of plain files, every `num_shards`-th compressed file)
+        """
+        config = super().default_configs()
+        config.update({"id_field": "id", "num_shards": 1, "shard_index": 0})
+        return config
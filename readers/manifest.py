@@ -0,0 +1,91 @@
+"""
+Manifest of the documents already processed by the detection pipeline, used to
+only process the documents whose inputs changed since the last run.
+
+The fingerprint of a document hashes its input json, the coling2018 `.ann`/`.txt`
+outputs for it and a version string of the lexicons, models and code.
+"""
+import fcntl
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+__all__ = [
+    "DetectionManifest",
+    "hash_files",
+]
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    """
+    sha1 over the names and contents of `paths`, a missing file hashes differently from an empty one
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(str(os.path.basename(path)).encode("utf-8"))
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                digest.update(b"\1" + f.read())
+        else:
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DetectionManifest:
+    """
+    json file {"version": ..., "documents": {pack name: fingerprint}} next to the packs
+    - version: lexicon/model/code version of the run, a different version invalidates all documents
+    """
+
+    def __init__(self, path: Path, version: str):
+        self.path = Path(path)
+        self.version = version
+
+    def fingerprint(self, json_path: Path, coling2018_dir: Path) -> str:
+        name = os.path.basename(json_path).split(".")[0]
+        return hash_files(
+            [json_path, Path(coling2018_dir) / f"{name}.ann", Path(coling2018_dir) / f"{name}.txt"]
+        ) + "-" + self.version
+
+    def _load(self) -> Dict[str, str]:
+        if not self.path.exists():
+            return {}
+        with open(self.path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.version:
+            return {}
+        return manifest["documents"]
+
+    def fingerprints(self, json_dir: Path, coling2018_dir: Path) -> Dict[str, str]:
+        """
+        current fingerprint of every input json file, by file name in the sorted listing
+        which the shards stride over
+        """
+        return {
+            f: self.fingerprint(Path(json_dir) / f, coling2018_dir) for f in sorted(os.listdir(json_dir))
+        }
+
+    def changed(self, fingerprints: Dict[str, str]) -> List[str]:
+        """
+        file names whose fingerprint differs from the one recorded in the manifest
+        """
+        documents = self._load()
+        return [f for f, fingerprint in fingerprints.items()
+                if documents.get(f.split(".")[0]) != fingerprint]
+
+    def update(self, fingerprints: Dict[str, str]):
+        """
+        record the fingerprints of processed files, several shard jobs may update the manifest at once
+        """
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            documents = self._load()
+            for f, fingerprint in fingerprints.items():
+                documents[f.split(".")[0]] = fingerprint
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": self.version, "documents": documents}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,166 @@
+"""
+Compact on-disk storage of DataPacks.
+
+An archive is a data file `<name>.packs` of zlib-compressed serialized packs,
+written one after the other, and an index `<name>.packs.idx` (json) mapping each
+pack name to the offset and length of its record. A pack is read by name with
+one seek, without listing or parsing the other packs.
+
+PackStore reads a directory of archives, a single archive, or a directory of
+json packs written by PackNameJsonPackWriter, with the same interface.
+"""
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+from tqdm import tqdm
+
+from forte.data.data_pack import DataPack
+
+__all__ = [
+    "ARCHIVE_SUFFIX",
+    "PackArchiveBuilder",
+    "PackArchive",
+    "PackStore",
+    "read_packs",
+]
+
+ARCHIVE_SUFFIX = ".packs"
+INDEX_SUFFIX = ".idx"
+
+
+class PackArchiveBuilder:
+    """
+    append serialized packs to the archive at `path`, a pack written again replaces
+    the previous record in the index (the old record stays in the data file).
+    The index is written on `close`.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self.index: Dict[str, Tuple[int, int]] = {}
+        if os.path.exists(self.path + INDEX_SUFFIX):
+            with open(self.path + INDEX_SUFFIX) as f:
+                self.index = {name: tuple(record) for name, record in json.load(f).items()}
+        self.data = open(self.path, "ab")
+
+    def add(self, pack_name: str, serialized_pack: str):
+        record = zlib.compress(serialized_pack.encode("utf-8"))
+        offset = self.data.seek(0, os.SEEK_END)
+        self.data.write(record)
+        self.index[pack_name] = (offset, len(record))
+
+    def close(self):
+        self.data.close()
+        tmp_path = f"{self.path}{INDEX_SUFFIX}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.path + INDEX_SUFFIX)
+
+
+class PackArchive:
+    """
+    read packs by name from the archive at `path`
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        with open(self.path + INDEX_SUFFIX) as f:
+            self.index: Dict[str, List[int]] = json.load(f)
+        self.data = open(self.path, "rb")
+
+    def names(self) -> List[str]:
+        return list(self.index.keys())
+
+    def __contains__(self, pack_name: str) -> bool:
+        return pack_name in self.index
+
+    def get_serialized(self, pack_name: str) -> str:
+        offset, length = self.index[pack_name]
+        self.data.seek(offset)
+        return zlib.decompress(self.data.read(length)).decode("utf-8")
+
+    def get(self, pack_name: str) -> DataPack:
+        return DataPack.deserialize(self.get_serialized(pack_name))
+
+    def close(self):
+        self.data.close()
+
+
+class PackStore:
+    """
+    packs by name from `path`, which is
+    - a directory with archives (e.g. one per detection shard), or a single archive
+    - a directory of json packs `<pack name>.json`
+    when archives share a pack name, the most recently written archive wins
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        path = Path(path)
+        if path.is_dir():
+            archive_paths = sorted(p for p in path.iterdir() if p.name.endswith(ARCHIVE_SUFFIX))
+        else:
+            archive_paths = [path]
+
+        self.archives = [PackArchive(p) for p in sorted(archive_paths, key=lambda p: os.path.getmtime(p))]
+        self.name2archive: Dict[str, PackArchive] = {}
+        for archive in self.archives:
+            for name in archive.names():
+                self.name2archive[name] = archive
+
+        # directory of json packs
+        self.json_dir = path if len(self.archives) == 0 else None
+        self.name2path: Dict[str, Path] = {}
+        if self.json_dir is not None:
+            for pack_path in sorted(self.json_dir.iterdir()):
+                if pack_path.suffix == ".json":
+                    self.name2path[pack_path.stem] = pack_path
+
+    def names(self) -> List[str]:
+        if self.json_dir is not None:
+            return list(self.name2path.keys())
+        return list(self.name2archive.keys())
+
+    def __contains__(self, pack_name: str) -> bool:
+        return pack_name in self.name2archive or pack_name in self.name2path
+
+    def source(self, pack_name: str) -> Tuple[str, float]:
+        """
+        file the pack is read from and its modification time
+        """
+        if self.json_dir is not None:
+            path = str(self.name2path[pack_name])
+        else:
+            path = self.name2archive[pack_name].path
+        return path, os.path.getmtime(path)
+
+    def get_serialized(self, pack_name: str) -> str:
+        if self.json_dir is not None:
+            with open(self.name2path[pack_name], "r") as rf:
+                return rf.read()
+        return self.name2archive[pack_name].get_serialized(pack_name)
+
+    def get(self, pack_name: str) -> DataPack:
+        return DataPack.deserialize(self.get_serialized(pack_name))
+
+    def items(self) -> Iterator[Tuple[str, DataPack]]:
+        for name in self.names():
+            yield name, self.get(name)
+
+    def close(self):
+        for archive in self.archives:
+            archive.close()
+
+
+def read_packs(path: Union[str, Path]) -> Dict[str, DataPack]:
+    """
+    all packs of a pack store (archives or json packs) by pack name
+    """
+    store = PackStore(path)
+    name2pack = {}
+    for _, pack in tqdm(store.items(), total=len(store.names())):
+        name2pack[pack.pack_name] = pack
+    store.close()
+    return name2pack
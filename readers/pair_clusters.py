@@ -0,0 +1,40 @@
+"""
+Clusters of document pairs, shared by the pair reader and the parallel pair pipeline.
+Kept free of forte imports so that the pipeline can partition pairs before loading forte.
+"""
+import os
+from typing import Dict, List, Tuple
+
+__all__ = [
+    "doc_name",
+    "order_pairs_by_cluster",
+]
+
+
+def doc_name(doc_path: str) -> str:
+    return os.path.basename(doc_path).split(".")[0]
+
+
+def order_pairs_by_cluster(pairs: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+    """
+    group the document pairs into clusters of pairs connected by shared documents,
+    clusters are in the order of their first pair and keep the order of their pairs
+    """
+    parent: Dict[str, str] = {}
+
+    def find(doc: str) -> str:
+        parent.setdefault(doc, doc)
+        while parent[doc] != doc:
+            parent[doc] = parent[parent[doc]]
+            doc = parent[doc]
+        return doc
+
+    for doc1, doc2 in pairs:
+        root1, root2 = find(doc1), find(doc2)
+        if root1 != root2:
+            parent[root2] = root1
+
+    clusters: Dict[str, List[Tuple[str, str]]] = {}
+    for doc1, doc2 in pairs:
+        clusters.setdefault(find(doc1), []).append((doc1, doc2))
+    return list(clusters.values())
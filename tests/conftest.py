@@ -0,0 +1,50 @@
+"""
+Shared helpers of the tests, which need forte and run from the repository root.
+"""
+import os
+import sys
+from typing import List, Optional
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("forte")
+
+from forte.data.data_pack import DataPack
+from ft.onto.base_ontology import Dependency, Sentence, Token
+
+from edu.cmu import EventMention
+
+
+def make_pack(name: str, text: str, mentions: List[str], heads: Optional[List[int]] = None) -> DataPack:
+    """
+    a pack of one sentence of space separated tokens (lemma: lowercased token)
+    with an EventMention for the first occurrence of each of `mentions`.
+    heads: index of the dependency head of each token, -1 for the root, no parse if None
+    """
+    pack = DataPack(name)
+    pack.set_text(text)
+
+    tokens = []
+    begin = 0
+    for word in text.split(" "):
+        token = Token(pack, begin, begin + len(word))
+        token.lemma = word.lower()
+        pack.add_entry(token)
+        tokens.append(token)
+        begin += len(word) + 1
+    pack.add_entry(Sentence(pack, 0, len(text)))
+
+    if heads is not None:
+        for token, head in zip(tokens, heads):
+            if head >= 0:
+                dependency = Dependency(pack, tokens[head], token)
+                dependency.rel_type = "dep"
+                pack.add_entry(dependency)
+
+    for mention in mentions:
+        begin = text.index(mention)
+        pack.add_entry(EventMention(pack, begin, begin + len(mention)))
+    return pack
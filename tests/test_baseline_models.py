@@ -0,0 +1,64 @@
+"""
+CorefClassifier builds the same inputs from pre-tokenized ids as from raw sentence pairs.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "baseline"))
+
+from models import CorefClassifier
+
+WORDS = ["the", "storm", "hit", "coast", "police", "arrested", "a", "man", "town", "flooded"]
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    path = tmp_path / "tiny-bert"
+    path.mkdir()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS
+    with open(path / "vocab.txt", "w") as wf:
+        wf.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(str(path / "vocab.txt")).save_pretrained(str(path))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32
+    )
+    BertModel(config).save_pretrained(str(path))
+    return path
+
+
+@pytest.mark.parametrize("max_seq_length", [15, 16])
+def test_collate_tokenized_matches_raw_pairs(model_dir, max_seq_length):
+    model = CorefClassifier(str(model_dir), 2, max_seq_length=max_seq_length, special_tag_tokens=["<E>", "</E>"])
+
+    rng = random.Random(0)
+    # lengths around the budget, many of the pairs are truncated
+    sentences = [
+        " ".join(["<E>"] + [rng.choice(WORDS) for _ in range(rng.randrange(0, 20))] + ["</E>"]) for _ in range(60)
+    ]
+    pairs = [(rng.randrange(len(sentences)), rng.randrange(len(sentences))) for _ in range(300)]
+    token_ids = [np.array(ids, dtype=np.int32) for ids in model.tokenize_sentences(sentences)]
+
+    truncated = 0
+    for id1, id2 in pairs:
+        raw = model.auto_tokenizer(
+            [sentences[id1]], [sentences[id2]], truncation=True, max_length=max_seq_length, return_tensors="pt"
+        )
+        tokenized, _, _ = model.collate_tokenized([(token_ids[id1], token_ids[id2], 0, 0)])
+        assert tokenized["input_ids"].tolist() == raw["input_ids"].tolist()
+        assert tokenized["token_type_ids"].tolist() == raw["token_type_ids"].tolist()
+        truncated += len(token_ids[id1]) + len(token_ids[id2]) + 3 > max_seq_length
+    assert truncated > 100
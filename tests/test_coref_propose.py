@@ -0,0 +1,37 @@
+"""
+Blocking keys and suggestions of the indexed suggestion providers.
+"""
+from forte.data.multi_pack import MultiPack
+
+from conftest import make_pack
+from edu.cmu import CrossEventRelation
+from processors.coref_propose import SameHeadLemmaSuggestionProvider
+
+TEXT = "The storm hit the coast"
+# The <- storm <- hit (root), the <- coast <- hit
+HEADS = [1, 2, -1, 4, 2]
+
+
+def head_lemmas(pack):
+    return [key for _, key in SameHeadLemmaSuggestionProvider().blocking_keys(pack)]
+
+
+def test_head_lemma_with_parse():
+    pack = make_pack("parsed", TEXT, ["hit the coast", "The storm"], heads=HEADS)
+    assert head_lemmas(pack) == ["storm", "hit"]
+
+
+def test_head_lemma_without_parse_is_last_token():
+    pack = make_pack("unparsed", TEXT, ["hit the coast", "The storm"])
+    assert head_lemmas(pack) == ["storm", "coast"]
+
+
+def test_suggestions_without_parse():
+    multi_pack = MultiPack()
+    multi_pack.add_pack_(make_pack("d1", TEXT, ["hit the coast", "The storm"]))
+    multi_pack.add_pack_(make_pack("d2", "A coast was flooded", ["A coast"]))
+
+    SameHeadLemmaSuggestionProvider()._process(multi_pack)
+
+    links = list(multi_pack.get(CrossEventRelation))
+    assert [(link.get_parent().text, link.get_child().text) for link in links] == [("hit the coast", "A coast")]
@@ -0,0 +1,91 @@
+"""
+EmbeddingSuggestionProvider end to end on a tiny random BERT, built offline.
+"""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import torch
+from forte.data.data_pack import DataPack
+from forte.pipeline import Pipeline
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+from conftest import make_pack
+from edu.cmu import CrossEventRelation
+from processors.embedding_suggestion import EmbeddingSuggestionProvider
+from readers.event_reader import TwoDocumentPackReader
+
+TEXT = "The storm hit the coast"
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    path = tmp_path / "tiny-bert"
+    path.mkdir()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + TEXT.lower().split(" ")
+    with open(path / "vocab.txt", "w") as wf:
+        wf.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(str(path / "vocab.txt")).save_pretrained(str(path))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32
+    )
+    BertModel(config).save_pretrained(str(path))
+    return path
+
+
+def run_pipeline(provider, model_dir, pack_dir, cache_dir):
+    pipeline = Pipeline()
+    pipeline.set_reader(TwoDocumentPackReader())
+    pipeline.add(
+        provider, {"model_name": str(model_dir), "cache_dir": str(cache_dir), "top_k": 1, "threshold": -1.0}
+    )
+    pipeline.initialize()
+    return list(pipeline.process_dataset(str(pack_dir), [("d1.json", "d2.json")]))
+
+
+def test_embedding_suggestions(tmp_path, model_dir):
+    pack_dir, cache_dir = tmp_path / "packs", tmp_path / "embeddings"
+    pack_dir.mkdir()
+    # same text: every mention is most similar to its copy in the other pack
+    for name in ["d1", "d2"]:
+        with open(pack_dir / f"{name}.json", "w") as wf:
+            wf.write(make_pack(name, TEXT, ["storm", "hit the coast"]).serialize())
+
+    provider = EmbeddingSuggestionProvider()
+    (multi_pack,) = run_pipeline(provider, model_dir, pack_dir, cache_dir)
+
+    links = list(multi_pack.get(CrossEventRelation))
+    assert [(link.get_parent().text, link.get_child().text) for link in links] == [
+        ("storm", "storm"),
+        ("hit the coast", "hit the coast"),
+    ]
+    assert len(list(cache_dir.glob("*.npz"))) == 2
+
+    def fail_encode(pack, mentions):
+        raise AssertionError("vectors should come from the cache")
+
+    # a pack deserialized again hits the memory cache, with the mentions of the new pack object
+    with open(pack_dir / "d1.json") as rf:
+        pack = DataPack.deserialize(rf.read())
+    provider._encode = fail_encode
+    mentions, vectors = provider.mention_vectors(pack)
+    assert [evm.text for evm in mentions] == ["storm", "hit the coast"]
+    assert all(evm.pack is pack for evm in mentions)
+    assert vectors.shape == (2, 16)
+
+    # a new process reads the vectors from disk
+    provider = EmbeddingSuggestionProvider()
+    provider._encode = fail_encode
+    (multi_pack,) = run_pipeline(provider, model_dir, pack_dir, cache_dir)
+    assert len(list(multi_pack.get(CrossEventRelation))) == 2
+
+    # changed mentions are encoded again
+    with open(pack_dir / "d1.json", "w") as wf:
+        wf.write(make_pack("d1", TEXT, ["storm"]).serialize())
+    provider = EmbeddingSuggestionProvider()
+    (multi_pack,) = run_pipeline(provider, model_dir, pack_dir, cache_dir)
+    links = list(multi_pack.get(CrossEventRelation))
+    assert [(link.get_parent().text, link.get_child().text) for link in links] == [("storm", "storm")]
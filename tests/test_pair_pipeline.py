@@ -0,0 +1,79 @@
+"""
+pair_pipeline.py with --workers 2 writes the same multipacks as the serial run.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from conftest import ROOT, make_pack
+
+DOCS = {
+    "d1": ("The storm hit the coast", ["storm", "hit"]),
+    "d2": ("A storm hit towns", ["storm", "hit"]),
+    "d3": ("The hit was strong", ["hit"]),
+    "d4": ("Police arrested a man", ["arrested"]),
+    "d5": ("The man was arrested", ["arrested"]),
+}
+
+
+def run_pair_pipeline(data_dir: Path, *args: str):
+    subprocess.run(
+        [sys.executable, "pair_pipeline.py", "--dir", str(data_dir), "--doc-pairs", str(data_dir / "clusters.txt")]
+        + ["--suggestions", "text", *args],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        check=True,
+    )
+
+
+def without_random_ids(value):
+    """
+    drop the ids forte draws for new multipacks and entries (uuid4),
+    the references to the entries of the member packs are kept
+    """
+    if isinstance(value, dict):
+        return {k: without_random_ids(v) for k, v in value.items() if k not in ("_tid", "_pack_id")}
+    if isinstance(value, list):
+        return [without_random_ids(v) for v in value]
+    return value
+
+
+def test_workers_match_serial_run(tmp_path):
+    serial_dir, parallel_dir = tmp_path / "serial", tmp_path / "parallel"
+    (serial_dir / "packs").mkdir(parents=True)
+    for name, (text, mentions) in DOCS.items():
+        with open(serial_dir / "packs" / f"{name}.json", "w") as wf:
+            wf.write(make_pack(name, text, mentions).serialize())
+    with open(serial_dir / "clusters.txt", "w") as wf:
+        wf.write("d1 d2 d3\nd4 d5\n")
+    shutil.copytree(serial_dir, parallel_dir)
+
+    run_pair_pipeline(serial_dir)
+    run_pair_pipeline(parallel_dir, "--workers", "2")
+
+    serial_out, parallel_out = serial_dir / "multipacks", parallel_dir / "multipacks"
+    files = sorted(str(p.relative_to(serial_out)) for p in serial_out.rglob("*") if p.is_file())
+    assert files == sorted(str(p.relative_to(parallel_out)) for p in parallel_out.rglob("*") if p.is_file())
+    assert "multi/pair_d4_and_d5" in files
+    with open(parallel_out / "multi" / "pair_d1_and_d2") as rf:
+        assert len(json.load(rf)["py/state"]["links"]) == 2
+
+    # member packs and their index lines keep the ids they were read with
+    assert (serial_out / "pack.idx").read_text() == (parallel_out / "pack.idx").read_text()
+    for f in files:
+        if f.startswith("packs/"):
+            assert (serial_out / f).read_text() == (parallel_out / f).read_text()
+
+    serial_multi = [line.split("\t") for line in (serial_out / "multi.idx").read_text().splitlines()]
+    parallel_multi = [line.split("\t") for line in (parallel_out / "multi.idx").read_text().splitlines()]
+    assert [path for _, path in serial_multi] == [path for _, path in parallel_multi]
+    assert len({pack_id for pack_id, _ in parallel_multi}) == len(parallel_multi)
+
+    for _, path in parallel_multi:
+        with open(serial_out / path) as serial_f, open(parallel_out / path) as parallel_f:
+            serial_mp, parallel_mp = json.load(serial_f), json.load(parallel_f)
+        # including the ids of the member packs (_pack_ref) and of the linked mentions
+        assert without_random_ids(serial_mp) == without_random_ids(parallel_mp)
@@ -0,0 +1,145 @@
+"""
+Memory-mapped lemma -> document frequency table.
+
+The gzip JSON table (tools/idf_table.json.gz) is converted once to a binary file
+next to it and then opened with mmap, so loading it costs nothing and the worker
+processes share the pages through the page cache.
+
+binary layout (little-endian):
+    magic b"IDF1", uint32 number of lemmas n
+    uint32[n + 1] offsets of the lemmas in the lemma blob
+    uint32[n] document frequencies
+    lemma blob: the utf-8 lemmas sorted by their bytes
+
+python -m tools.idf_table tools/idf_table.json.gz tools/idf_table.bin
+"""
+import argparse
+import gzip
+import json
+import mmap
+import os
+import struct
+from functools import lru_cache
+from typing import Dict, Optional
+
+__all__ = [
+    "IDF_TABLE",
+    "IdfTable",
+    "convert_idf_table",
+    "load_idf_table",
+]
+
+MAGIC = b"IDF1"
+HEADER = struct.Struct("<4sI")
+UINT32 = struct.Struct("<I")
+
+IDF_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "idf_table.json.gz")
+
+
+def convert_idf_table(json_path: str, bin_path: str):
+    """
+    write the gzip JSON table `json_path` in the binary format to `bin_path`,
+    the file is replaced atomically so that concurrent readers never see a partial table
+    """
+    with gzip.open(json_path, "rt", encoding="utf-8") as f:
+        df_table: Dict[str, int] = json.load(f)
+
+    items = sorted((lemma.encode("utf-8"), df) for lemma, df in df_table.items())
+    offsets = [0]
+    for lemma, _ in items:
+        offsets.append(offsets[-1] + len(lemma))
+
+    n = len(items)
+    tmp_path = f"{bin_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, n))
+        f.write(struct.pack(f"<{n + 1}I", *offsets))
+        f.write(struct.pack(f"<{n}I", *[df for _, df in items]))
+        f.write(b"".join(lemma for lemma, _ in items))
+    os.replace(tmp_path, bin_path)
+
+
+class IdfTable:
+    """
+    read-only mapping lemma -> document frequency over a binary table,
+    supports `in`, `[]`, `get` and `len` like the dict loaded from JSON
+    """
+
+    def __init__(self, bin_path: str):
+        with open(bin_path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._size = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{bin_path} is not a binary idf table")
+        self._offsets_start = HEADER.size
+        self._dfs_start = self._offsets_start + UINT32.size * (self._size + 1)
+        self._lemmas_start = self._dfs_start + UINT32.size * self._size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _offset(self, idx: int) -> int:
+        return self._lemmas_start + UINT32.unpack_from(self._buffer, self._offsets_start + UINT32.size * idx)[0]
+
+    def _lemma(self, idx: int) -> bytes:
+        return self._buffer[self._offset(idx):self._offset(idx + 1)]
+
+    def _find(self, lemma: str) -> int:
+        """
+        position of `lemma` in the table, -1 if it is not there
+        """
+        key = lemma.encode("utf-8")
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if self._lemma(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._size and self._lemma(low) == key:
+            return low
+        return -1
+
+    def get(self, lemma: str, default: Optional[int] = None) -> Optional[int]:
+        if not isinstance(lemma, str):
+            return default
+        idx = self._find(lemma)
+        if idx < 0:
+            return default
+        return UINT32.unpack_from(self._buffer, self._dfs_start + UINT32.size * idx)[0]
+
+    def __contains__(self, lemma) -> bool:
+        return self.get(lemma) is not None
+
+    def __getitem__(self, lemma: str) -> int:
+        df = self.get(lemma)
+        if df is None:
+            raise KeyError(lemma)
+        return df
+
+
+@lru_cache(maxsize=None)
+def load_idf_table(json_path: str = IDF_TABLE) -> IdfTable:
+    """
+    open the binary table converted from `json_path` (same path with a .bin suffix),
+    converting it first if it is missing or older than the JSON table.
+    The table is opened once per process.
+    """
+    bin_path = os.path.splitext(json_path)[0]
+    if bin_path.endswith(".json"):
+        bin_path = bin_path[: -len(".json")]
+    bin_path += ".bin"
+
+    if not os.path.exists(bin_path) or os.path.getmtime(bin_path) < os.path.getmtime(json_path):
+        convert_idf_table(json_path, bin_path)
+    return IdfTable(bin_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="convert the gzip JSON idf table to the binary format")
+    parser.add_argument("json_path", help="gzip JSON table, e.g. tools/idf_table.json.gz")
+    parser.add_argument("bin_path", help="output binary table, e.g. tools/idf_table.bin")
+    args = parser.parse_args()
+
+    convert_idf_table(args.json_path, args.bin_path)
@@ -0,0 +1,68 @@
+"""
+Registry of the lexicons used by the event detectors.
+
+Each lexicon is read once per process and frozen, so detectors built several
+times (or several detectors in one pipeline) share the same objects.
+Default paths are relative to this directory instead of the working directory.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import FrozenSet, Tuple
+
+__all__ = [
+    "TOOLS_DIR",
+    "EVENT_LEMMAS",
+    "NOMBANK_PROPOSITIONS",
+    "REPORTING_VERBS",
+    "STATIVE_VERBS",
+    "SHIFTLIST",
+    "KEYWORD_EVENT_LEMMAS",
+    "AUXILIARY_VERBS",
+    "load_word_list",
+    "load_event_lemmas",
+    "load_nombank_lemmas",
+]
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EVENT_LEMMAS = os.path.join(TOOLS_DIR, "event_lemma.txt")
+NOMBANK_PROPOSITIONS = os.path.join(TOOLS_DIR, "pruned_nombank_propositions_chain_10.json")
+REPORTING_VERBS = os.path.join(TOOLS_DIR, "reporting_verbs.txt")
+STATIVE_VERBS = os.path.join(TOOLS_DIR, "stative_verbs.txt")
+# manually gathered shiftlist (blacklist)
+SHIFTLIST = os.path.join(TOOLS_DIR, "shiftlist.txt")
+
+# dictionary of the example KeywordEventDetector
+KEYWORD_EVENT_LEMMAS = frozenset({
+    'bomb', 'detonate', 'kill', 'injure', 'kidnap', 'shootout', 'die',
+    'explode', 'death'
+})
+
+AUXILIARY_VERBS = frozenset({
+    'will', 'would', 'could', 'can', 'might', 'may', 'must', 'should', 'have'
+})
+
+
+@lru_cache(maxsize=None)
+def load_word_list(path: str) -> FrozenSet[str]:
+    """
+    one word per line, e.g. REPORTING_VERBS, STATIVE_VERBS or SHIFTLIST
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return frozenset(x.strip() for x in f.readlines())
+
+
+@lru_cache(maxsize=None)
+def load_event_lemmas(path: str = EVENT_LEMMAS) -> Tuple[str, ...]:
+    """
+    event lemmas in file order, multi-word lemmas are separated by spaces
+    """
+    with open(path, encoding='utf-8') as f:
+        return tuple(f.read().splitlines())
+
+
+@lru_cache(maxsize=None)
+def load_nombank_lemmas(path: str = NOMBANK_PROPOSITIONS) -> FrozenSet[str]:
+    with open(path, 'r') as f:
+        return frozenset(json.load(f))
@@ -1,4 +1,7 @@
 import logging
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
 
 
 def set_logging():
@@ -7,3 +10,46 @@ def set_logging():
         format="%(asctime)s [%(levelname)s] %(message)s",
         handlers=[logging.StreamHandler()]
     )
+
+
+class StartupProfiler:
+    """
+    records the wall-clock time of the startup steps of a pipeline (imports, model loading)
+    nothing is recorded unless `enabled`
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.steps: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.steps.append((name, time.perf_counter() - start))
+
+    def time_initialize(self, component, name: str = None):
+        """
+        time the `initialize` (model loading) of a pipeline component when the pipeline calls it
+        """
+        if not self.enabled:
+            return component
+        name = name or type(component).__name__
+        initialize = component.initialize
+
+        def timed_initialize(*args, **kwargs):
+            with self.step(f"initialize {name}"):
+                return initialize(*args, **kwargs)
+
+        component.initialize = timed_initialize
+        return component
+
+    def report(self):
+        if not self.enabled:
+            return
+        for name, elapsed in self.steps:
+            logging.info(f"startup {name}: {elapsed:.2f}s")
+        logging.info(f"startup total: {sum(elapsed for _, elapsed in self.steps):.2f}s")